@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+_executor = None
+
+
+def get_executor():
+    """Пул потоков для синхронного кода асинхронных представлений."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_READ_THREADS,
+            thread_name_prefix='async-read',
+        )
+    return _executor
+
+
+def run_view(view, request, *args, **kwargs):
+    """Выполняет синхронное представление и рендерит ответ в потоке пула.
+
+    У каждого потока свое соединение с БД, поэтому старые соединения
+    закрываются здесь, а не сигналами начала и конца запроса.
+    """
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def as_async_view(view):
+    """Асинхронная обертка синхронного представления.
+
+    Запрос не занимает поток обработчика ASGI на время работы с БД:
+    число одновременных запросов ограничено пулом потоков, а не
+    числом процессов.
+    """
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            get_executor(),
+            functools.partial(
+                context.run, run_view, view, request, *args, **kwargs
+            ),
+        )
+
+    return async_view
+
+
+def async_urlpatterns(urlpatterns, names):
+    """Заменяет представления маршрутов с указанными именами на async."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            as_async_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in urlpatterns
+    ]
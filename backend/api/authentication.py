@@ -0,0 +1,156 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from users.models import User
+from .cache import bump_versions, get_versions, is_shared_cache
+from .constants import TOKEN_CACHE_SIZE, TOKEN_CACHE_TIMEOUT
+from .db_router import use_primary
+
+# Поля пользователя, которых нет в снимке: хеш пароля не хранится
+# в кэше, а счетчики меняются запросом UPDATE в обход save() и при
+# сохранении снимка не перезаписываются.
+DEFERRED_USER_FIELDS = ('password', 'recipes_count', 'subscribers_count')
+
+
+def token_cache_key(key):
+    """Ключ снимка токена в общем кэше (без самого токена)."""
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return f'auth:token:{digest}'
+
+
+def user_version_key(user_id):
+    """Ключ версии токенов пользователя."""
+    return f'auth:user:{user_id}:version'
+
+
+def invalidate_user_tokens(user_id):
+    """Сбрасывает снимки всех токенов пользователя после коммита."""
+    key = user_version_key(user_id)
+    transaction.on_commit(lambda: bump_versions(key))
+
+
+class TokenCache:
+    """LRU снимков токен -> пользователь в памяти процесса.
+
+    Снимок живет не дольше TOKEN_CACHE_TIMEOUT секунд и действителен,
+    пока версия токенов пользователя в общем кэше не изменилась.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            if item[-1] < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return item[:-1]
+
+    def set(self, key, *value):
+        with self.lock:
+            self.items[key] = (*value, time.monotonic() + TOKEN_CACHE_TIMEOUT)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену без запроса к БД на каждый HTTP-запрос.
+
+    Снимок токена с пользователем берется из LRU процесса. Версия токенов
+    пользователя меняется при выходе, удалении токена, смене пароля
+    и деактивации, после чего снимок перечитывается из БД. Версии должны
+    быть видны всем воркерам, поэтому с кэшем в памяти процесса снимки
+    не используются. При TOKEN_CACHE_SHARED в общем кэше хранятся только
+    id пользователя и версия под хешем токена, а пользователь
+    перечитывается по id.
+    """
+
+    def authenticate_credentials(self, key):
+        if not is_shared_cache():
+            with use_primary():
+                return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(key)
+        snapshot = token_cache.get(cache_key)
+        if snapshot is not None:
+            token, version = snapshot
+            if get_versions(user_version_key(token.user_id)) == (version,):
+                return self.get_result(token)
+            token_cache.delete(cache_key)
+
+        token = None
+        if settings.TOKEN_CACHE_SHARED:
+            snapshot = cache.get(cache_key)
+            if snapshot is not None:
+                user_id, version = snapshot
+                if get_versions(user_version_key(user_id)) == (version,):
+                    token = self.get_user_token(key, user_id)
+        if token is None:
+            token = self.get_token(key)
+            # Изменение, закоммиченное между чтением токена и версии,
+            # может остаться в снимке, но не дольше TOKEN_CACHE_TIMEOUT.
+            version, = get_versions(user_version_key(token.user_id))
+            if settings.TOKEN_CACHE_SHARED:
+                cache.set(
+                    cache_key, (token.user_id, version), TOKEN_CACHE_TIMEOUT
+                )
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        token_cache.set(cache_key, token, version)
+        return self.get_result(token)
+
+    def get_token(self, key):
+        """Токен с пользователем из основной базы."""
+        with use_primary():
+            try:
+                return self.get_model().objects.select_related(
+                    'user'
+                ).defer(
+                    *(f'user__{field}' for field in DEFERRED_USER_FIELDS)
+                ).get(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+
+    def get_user_token(self, key, user_id):
+        """Токен по снимку из общего кэша: перечитывается только юзер."""
+        with use_primary():
+            user = User.objects.defer(*DEFERRED_USER_FIELDS).filter(
+                pk=user_id
+            ).first()
+        if user is None:
+            return None
+        return self.get_model()(key=key, user=user)
+
+    def get_result(self, token):
+        """Копия снимка: запрос может изменить пользователя."""
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
@@ -0,0 +1,162 @@
+import hashlib
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+
+from .db_router import use_primary
+from .constants import (
+    RESPONSE_CACHE_TIMEOUT,
+    RESPONSE_CACHE_LOCK_TIMEOUT,
+    RESPONSE_CACHE_POLL_INTERVAL,
+)
+
+# Версия всех страниц списка рецептов:
+RECIPES_VERSION_KEY = 'recipes:version'
+
+# Версия справочников, от которых зависят все ответы с рецептами:
+REFERENCE_VERSION_KEY = 'recipes:reference:version'
+
+
+def recipe_version_key(recipe_id):
+    """Ключ версии отдельного рецепта."""
+    return f'recipes:{recipe_id}:version'
+
+
+def is_shared_cache():
+    """Видят ли все процессы одни и те же ключи кэша."""
+    return not isinstance(caches['default'], (DummyCache, LocMemCache))
+
+
+def get_versions(*keys):
+    """Возвращает текущие версии, создавая недостающие."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_versions(*keys):
+    """Обновляет версии, делая устаревшими все зависящие от них ключи.
+
+    В качестве версии используется время, поэтому вытеснение ключа
+    версии из кэша не может вернуть к жизни старые ответы.
+    """
+    version = time.time_ns()
+    cache.set_many({key: version for key in keys}, None)
+
+
+def invalidate_recipes(recipe_ids=()):
+    """Сбрасывает кэш списка рецептов и указанных рецептов после коммита."""
+    keys = (RECIPES_VERSION_KEY, *map(recipe_version_key, recipe_ids))
+    transaction.on_commit(lambda: bump_versions(*keys))
+
+
+def invalidate_reference():
+    """Сбрасывает кэш всех ответов с рецептами после коммита."""
+    transaction.on_commit(
+        lambda: bump_versions(RECIPES_VERSION_KEY, REFERENCE_VERSION_KEY)
+    )
+
+
+def build_cache_key(prefix, request, *version_keys, path=None):
+    """Строит ключ по версиям и нормализованному адресу запроса."""
+    query = '&'.join(
+        f'{name}={value}'
+        for name in sorted(request.query_params)
+        for value in sorted(request.query_params.getlist(name))
+    )
+    path = path or request.path
+    url = f'{request.scheme}://{request.get_host()}{path}?{query}'
+    versions = '.'.join(map(str, get_versions(*version_keys)))
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'{prefix}:{versions}:{digest}'
+
+
+def wait_for_response(key, lock_key):
+    """Ждет, пока другой воркер положит ответ в кэш."""
+    deadline = time.monotonic() + RESPONSE_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(RESPONSE_CACHE_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None or cache.get(lock_key) is None:
+            return data
+    return None
+
+
+def get_cached_response(key, get_response):
+    """Возвращает ответ из кэша или вычисляет его один раз.
+
+    Пересчет защищен блокировкой через `cache.add`: пока один воркер
+    вычисляет ответ, остальные ждут его появления в кэше.
+    """
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
+
+    lock_key = f'{key}:lock'
+    is_leader = cache.add(lock_key, True, RESPONSE_CACHE_LOCK_TIMEOUT)
+    if not is_leader:
+        data = wait_for_response(key, lock_key)
+        if data is not None:
+            return Response(data)
+
+    try:
+        with use_primary():
+            response = get_response()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+    finally:
+        if is_leader:
+            cache.delete(lock_key)
+    return response
+
+
+class AnonymousCacheMixin:
+    """Кэширует ответы list и retrieve для анонимных пользователей.
+
+    Версии ответов должны быть видны всем воркерам, поэтому с кэшем
+    в памяти процесса ответы не кэшируются.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated or not is_shared_cache():
+            return super().list(request, *args, **kwargs)
+        key = build_cache_key(
+            'recipes:list', request,
+            RECIPES_VERSION_KEY, REFERENCE_VERSION_KEY,
+        )
+        return get_cached_response(
+            key, lambda: super(AnonymousCacheMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            # /recipes/01/ и /recipes/1/ - один рецепт с одной версией.
+            pk = int(kwargs[self.lookup_field])
+        except ValueError:
+            pk = None
+        if (
+            pk is None or request.user.is_authenticated
+            or not is_shared_cache()
+        ):
+            return super().retrieve(request, *args, **kwargs)
+        key = build_cache_key(
+            'recipes:detail', request,
+            recipe_version_key(pk), REFERENCE_VERSION_KEY,
+            path=reverse('recipes-detail', args=(pk,)),
+        )
+        return get_cached_response(
+            key, lambda: super(AnonymousCacheMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
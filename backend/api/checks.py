@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from .cache import is_shared_cache
+
+
+@register()
+def check_replicas_cache(app_configs, **kwargs):
+    """Реплики чтения работают только с общим для воркеров кэшем."""
+    if settings.DATABASE_REPLICAS and not is_shared_cache():
+        return [Error(
+            'DB_REPLICAS задан, а кэш не общий для воркеров: привязка '
+            'клиента к основной базе после изменения не будет видна '
+            'другим воркерам.',
+            hint='Укажите CACHE_BACKEND, например Redis или Memcached.',
+            id='api.E001',
+        )]
+    return []
@@ -7,4 +7,96 @@ PAGE_SIZE = 6
 # Имя поля для количества результатов:
 PAGE_SIZE_QUERY_PARAM = 'limit'
 
+# Порядок для курсорной пагинации рецептов:
+RECIPE_CURSOR_ORDERING = ('-pub_date', '-id')
+
+# Порядок для курсорной пагинации пользователей:
+USER_CURSOR_ORDERING = ('username',)
+
+# ------------->
+
+# КОНСТАНТЫ ДЛЯ КЭША ОТВЕТОВ
+# <--------------
+
+# Время жизни закэшированного ответа в секундах:
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+
+# Время жизни блокировки на пересчет ответа в секундах:
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+
+# Интервал ожидания пересчета другим воркером в секундах:
+RESPONSE_CACHE_POLL_INTERVAL = 0.05
+
+# ------------->
+
+# КОНСТАНТЫ ДЛЯ КЭША СПРАВОЧНИКОВ
+# <--------------
+
+# Как часто сверять версию справочника с общим кэшем в секундах:
+REFERENCE_CHECK_INTERVAL = 1
+
+# ------------->
+
+# КОНСТАНТЫ ДЛЯ МАССОВЫХ ОПЕРАЦИЙ
+# <--------------
+
+# Максимум рецептов в одном запросе к избранному или списку покупок:
+MAX_BULK_RECIPES = 100
+
+# ------------->
+
+# КОНСТАНТЫ ДЛЯ ИНДЕКСА ИНГРЕДИЕНТОВ РЕЦЕПТОВ
+# <--------------
+
+# Сколько изменений применять к индексу вместо полной перестройки:
+RECIPE_INDEX_MAX_CHANGES = 1000
+
+# Время хранения записи журнала изменений в секундах:
+RECIPE_INDEX_CHANGE_TIMEOUT = 60 * 60 * 24
+
+# Макс. кол-во id рецептов из индекса в условии запроса,
+# при большем кол-ве в БД передаются только id страницы:
+RECIPE_INDEX_MAX_IDS = 1000
+
+# ------------->
+
+# КОНСТАНТЫ ДЛЯ АСИНХРОННОГО РЕЖИМА
+# <--------------
+
+# Маршруты чтения, которые под ASGI обслуживаются асинхронно:
+ASYNC_URL_NAMES = frozenset((
+    'recipes-list',
+    'recipes-detail',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+    'users-me',
+))
+
+# ------------->
+
+# КОНСТАНТЫ ДЛЯ УЧЕТА SQL-ЗАПРОСОВ
+# <--------------
+
+# С какого числа повторов запрос считается признаком N+1:
+SQL_REPEATED_QUERY_THRESHOLD = 5
+
+# Запросы дольше стольких миллисекунд попадают в лог:
+SQL_SLOW_REQUEST_MS = 500
+
+# Сколько повторяющихся запросов выводить в лог:
+SQL_LOGGED_FINGERPRINTS = 3
+
+# ------------->
+
+# КОНСТАНТЫ ДЛЯ КЭША ТОКЕНОВ
+# <--------------
+
+# Сколько снимков токенов хранить в памяти процесса:
+TOKEN_CACHE_SIZE = 10000
+
+# Время жизни снимка токена в секундах:
+TOKEN_CACHE_TIMEOUT = 60 * 5
+
 # ------------->
@@ -0,0 +1,43 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# База для чтения в текущем запросе, None - основная:
+read_database = contextvars.ContextVar('read_database', default=None)
+
+
+def choose_replica():
+    """Возвращает случайную реплику или None, если реплик нет."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def use_primary():
+    """Временно читает из основной базы.
+
+    Нужно там, где прочитанные данные кэшируются под новой версией:
+    отставшая реплика не должна попасть в кэш.
+    """
+    token = read_database.set(None)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+class ReplicaRouter:
+    """Направляет чтение в реплику, выбранную для текущего запроса."""
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -1,18 +1,80 @@
+import csv
+import json
 from datetime import date
 
+from rest_framework.negotiation import DefaultContentNegotiation
 
-def download_txt(data, user):
-    """Функция для загрузки списка покупок в txt формате."""
 
+def get_header(user):
+    """Возвращает заголовок списка покупок и текущую дату."""
     current_date = date.today().strftime('%d-%m-%Y')
-    header = f'Список покупок {user}\nДата: {current_date}'
+    return f'Список покупок {user}', current_date
+
+
+def download_txt(data, user):
+    """Генератор списка покупок в txt формате."""
+
+    title, current_date = get_header(user)
+    yield f'{title}\nДата: {current_date}\n'
+
+    for item in data:
+        yield (
+            f'\n{item["ingredient__name"]} {item["total_amount"]} '
+            f'{item["ingredient__measurement_unit"]}'
+        )
+
+
+class Echo:
+    """Псевдо-файл, возвращающий записанную строку для csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def download_csv(data, user):
+    """Генератор списка покупок в csv формате."""
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+
+    for item in data:
+        yield writer.writerow((
+            item['ingredient__name'],
+            item['total_amount'],
+            item['ingredient__measurement_unit'],
+        ))
+
+
+def download_json(data, user):
+    """Генератор списка покупок в json формате."""
+
+    title, current_date = get_header(user)
+    yield '{{"title": {}, "date": {}, "ingredients": ['.format(
+        json.dumps(title, ensure_ascii=False), json.dumps(current_date)
+    )
+
+    separator = ''
+    for item in data:
+        yield separator + json.dumps({
+            'name': item['ingredient__name'],
+            'amount': item['total_amount'],
+            'measurement_unit': item['ingredient__measurement_unit'],
+        }, ensure_ascii=False)
+        separator = ', '
+
+    yield ']}'
+
+
+# Форматы выгрузки: генератор и content type.
+DOWNLOAD_FORMATS = {
+    'txt': (download_txt, 'text/plain; charset=utf-8'),
+    'csv': (download_csv, 'text/csv; charset=utf-8'),
+    'json': (download_json, 'application/json; charset=utf-8'),
+}
 
-    file_data = '\n'.join([
-        f'{item["ingredient__name"]} {item["total_amount"]} '
-        f'{item["ingredient__measurement_unit"]}'
-        for item in data
-    ])
 
-    content = f'{header}\n\n{file_data}'
+class DownloadContentNegotiation(DefaultContentNegotiation):
+    """Не выбирает рендерер по `?format=`: там передается формат файла."""
 
-    return content
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
@@ -0,0 +1,51 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64FieldMixin, HybridImageField
+from rest_framework import serializers
+from rest_framework.fields import ImageField
+
+from recipes.constants import MAX_IMAGE_SIZE
+from recipes.images import check_image, get_variant_urls
+
+
+class LimitedHybridImageField(HybridImageField):
+    """Изображение с ограничением размера и кол-ва пикселей.
+
+    Принимает строку base64 или файл из multipart/form-data.
+    """
+
+    def to_internal_value(self, data):
+        # base64 увеличивает размер данных примерно на треть.
+        if isinstance(data, str) and len(data) > MAX_IMAGE_SIZE * 4 // 3 + 64:
+            raise serializers.ValidationError(
+                'Размер изображения не может быть больше '
+                f'{MAX_IMAGE_SIZE // (1024 * 1024)} МБ.'
+            )
+        if isinstance(data, UploadedFile):
+            file = ImageField.to_internal_value(self, data)
+        else:
+            file = Base64FieldMixin.to_internal_value(self, data)
+        if file is not None:
+            try:
+                check_image(file)
+            except DjangoValidationError as error:
+                raise serializers.ValidationError(error.messages)
+        return file
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Адреса уменьшенных вариантов изображения."""
+
+    def __init__(self, variants, **kwargs):
+        self.variants = variants
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        urls = get_variant_urls(value, self.variants)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            variant: request.build_absolute_uri(url)
+            for variant, url in urls.items()
+        }
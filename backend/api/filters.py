@@ -1,7 +1,95 @@
+from itertools import islice
+
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import filters, FilterSet
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import IngredientInRecipe, Recipe
+from recipes.search import search_recipes
+from .cache import is_shared_cache
+from .constants import RECIPE_INDEX_MAX_IDS
+from .recipe_index import count_bits, recipe_index, to_ids
+from .reference import tags_reference
+
+
+def get_tag_choices():
+    """Варианты фильтра по тегам из кэша справочника."""
+    return [(tag['slug'], tag['name']) for tag in tags_reference.load().items]
+
+
+def recipe_ingredients(**lookups):
+    """Подзапрос: строки ингредиентов рецепта из внешнего запроса."""
+    return IngredientInRecipe.objects.filter(recipe=OuterRef('pk'), **lookups)
+
+
+class IndexedRecipes:
+    """Выборка рецептов, ограниченная битовым множеством из индекса.
+
+    Страница набирается из id выборки в порядке сортировки, входящих в
+    множество, и в БД передаются только id этой страницы. Методы
+    `filter`, `order_by`, `get` и `count` нужны пагинации и `get_object`.
+    """
+
+    def __init__(self, queryset, bits, ids=None):
+        self.queryset = queryset
+        self.bits = bits
+        self.ids = set(to_ids(bits)) if ids is None else ids
+
+    @property
+    def model(self):
+        return self.queryset.model
+
+    def clone(self, queryset):
+        return IndexedRecipes(queryset, self.bits, self.ids)
+
+    def filter(self, *args, **kwargs):
+        return self.clone(self.queryset.filter(*args, **kwargs))
+
+    def order_by(self, *fields):
+        return self.clone(self.queryset.order_by(*fields))
+
+    def matching_ids(self):
+        """Id рецептов выборки из множества в порядке сортировки."""
+        ids = self.queryset.values_list('pk', flat=True).iterator()
+        return (pk for pk in ids if pk in self.ids)
+
+    def count(self):
+        if not self.queryset.query.has_filters():
+            return len(self.ids)
+        return sum(1 for _ in self.matching_ids())
+
+    def get(self, *args, **kwargs):
+        recipe = self.queryset.get(*args, **kwargs)
+        if recipe.pk not in self.ids:
+            raise self.model.DoesNotExist
+        return recipe
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        page = list(islice(self.matching_ids(), key.start, key.stop))
+        return list(self.queryset.filter(pk__in=page))
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def filter_by_index(queryset, bits):
+    """Фильтрует рецепты по битовому множеству из индекса.
+
+    Небольшое множество передается в БД списком id, а большое
+    отбирается постранично, без десятков тысяч параметров в запросе.
+    """
+    if count_bits(bits) <= RECIPE_INDEX_MAX_IDS:
+        return queryset.filter(pk__in=to_ids(bits))
+    return IndexedRecipes(queryset, bits)
+
+
+class IdInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Фильтр по списку id через запятую."""
+
+    field_class = forms.IntegerField
 
 
 class IngredientFilter(SearchFilter):
@@ -13,10 +101,9 @@ class IngredientFilter(SearchFilter):
 class RecipeFilter(FilterSet):
     """Фильтрация для рецептов."""
 
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices,
         field_name='tags__slug',
-        to_field_name='slug'
     )
     is_in_shopping_cart = filters.NumberFilter(
         method='is_in_shopping_cart_filter'
@@ -24,6 +111,18 @@ class RecipeFilter(FilterSet):
     is_favorited = filters.NumberFilter(
         method='is_favorited_filter'
     )
+    search = filters.CharFilter(
+        method='search_filter'
+    )
+    ingredients = IdInFilter(
+        method='ingredients_filter'
+    )
+    exclude_ingredients = IdInFilter(
+        method='exclude_ingredients_filter'
+    )
+    available = IdInFilter(
+        method='available_filter'
+    )
 
     class Meta:
         model = Recipe
@@ -32,6 +131,10 @@ class RecipeFilter(FilterSet):
             'author',
             'is_favorited',
             'is_in_shopping_cart',
+            'search',
+            'ingredients',
+            'exclude_ingredients',
+            'available',
         )
 
     def is_in_shopping_cart_filter(self, queryset, name, value):
@@ -45,3 +148,53 @@ class RecipeFilter(FilterSet):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorites__user=self.request.user)
         return queryset
+
+    def search_filter(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию рецепта."""
+        return search_recipes(queryset, value)
+
+    def filter_queryset(self, queryset):
+        self.index_bits = None
+        queryset = super().filter_queryset(queryset)
+        if self.index_bits is None:
+            return queryset
+        return filter_by_index(queryset, self.index_bits)
+
+    def use_index(self, queryset, bits):
+        """Добавляет множество рецептов к условию по индексу."""
+        if self.index_bits is not None:
+            bits &= self.index_bits
+        self.index_bits = bits
+        return queryset
+
+    def ingredients_filter(self, queryset, name, value):
+        """Рецепты, в которых есть все указанные ингредиенты."""
+        if is_shared_cache():
+            return self.use_index(
+                queryset, recipe_index.load().containing(value)
+            )
+        return queryset.filter(
+            *(Exists(recipe_ingredients(ingredient=pk)) for pk in set(value))
+        )
+
+    def exclude_ingredients_filter(self, queryset, name, value):
+        """Рецепты без указанных ингредиентов."""
+        if is_shared_cache():
+            index = recipe_index.load()
+            return self.use_index(
+                queryset, index.recipes & ~index.with_any(value)
+            )
+        return queryset.filter(
+            ~Exists(recipe_ingredients(ingredient__in=value))
+        )
+
+    def available_filter(self, queryset, name, value):
+        """Рецепты, которые можно приготовить из указанных ингредиентов."""
+        if is_shared_cache():
+            return self.use_index(
+                queryset, recipe_index.load().cookable(value)
+            )
+        return queryset.filter(
+            Exists(recipe_ingredients()),
+            ~Exists(recipe_ingredients().exclude(ingredient__in=value)),
+        )
@@ -0,0 +1,51 @@
+from bisect import bisect_left
+
+from .reference import ingredients_reference
+
+
+def normalize(value):
+    """Приводит строку к виду для поиска: регистр и ё/е."""
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Отсортированный индекс названий ингредиентов для автодополнения.
+
+    Совпадения по префиксу находятся бинарным поиском, после них
+    добавляются совпадения по подстроке.
+    """
+
+    def __init__(self, items):
+        self.source = items
+        entries = sorted(
+            (normalize(item['name']), position)
+            for position, item in enumerate(items)
+        )
+        self.keys = [key for key, _ in entries]
+        self.items = [items[position] for _, position in entries]
+
+    def search(self, query):
+        """Возвращает ингредиенты: сначала по префиксу, затем по подстроке."""
+        query = normalize(query.strip())
+        if not query:
+            return list(self.source)
+        start = end = bisect_left(self.keys, query)
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        return self.items[start:end] + [
+            item for key, item in zip(self.keys, self.items)
+            if query in key and not key.startswith(query)
+        ]
+
+
+_index = None
+
+
+def get_ingredient_index():
+    """Возвращает индекс, перестроенный при изменении справочника."""
+    global _index
+    items = ingredients_reference.load().items
+    index = _index
+    if index is None or index.source is not items:
+        index = _index = IngredientIndex(items)
+    return index
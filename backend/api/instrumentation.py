@@ -0,0 +1,71 @@
+import contextvars
+import re
+import sys
+import time
+from collections import Counter
+
+from rest_framework.serializers import BaseSerializer
+
+from .constants import SQL_REPEATED_QUERY_THRESHOLD
+
+# Статистика SQL текущего запроса, None - запрос не попал в выборку:
+current_stats = contextvars.ContextVar('sql_stats', default=None)
+
+# Списки параметров IN разной длины считаются одним запросом:
+IN_PARAMS = re.compile(r'\((?:%s, )+%s\)')
+
+
+def fingerprint(sql):
+    """Нормализованный текст запроса без значений параметров."""
+    return IN_PARAMS.sub('(%s, ...)', sql)
+
+
+def find_caller():
+    """Метод сериализатора, из которого выполняется запрос, или None."""
+    frame = sys._getframe(3)
+    while frame is not None:
+        instance = frame.f_locals.get('self')
+        if isinstance(instance, BaseSerializer):
+            return f'{type(instance).__name__}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryStats:
+    """Кол-во, время и повторы SQL-запросов одного HTTP-запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.callers = {}
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        key = fingerprint(sql)
+        self.fingerprints[key] += 1
+        # Источник ищется только у повторов, чтобы не обходить стек зря.
+        if self.fingerprints[key] > 1:
+            self.callers.setdefault(key, Counter())[find_caller()] += 1
+
+    def repeated(self):
+        """Запросы, повторенные не меньше SQL_REPEATED_QUERY_THRESHOLD раз."""
+        return [
+            (key, count, self.callers.get(key, Counter()))
+            for key, count in self.fingerprints.most_common()
+            if count >= SQL_REPEATED_QUERY_THRESHOLD
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка выполнения запросов, подключаемая к каждому соединению."""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(sql, time.perf_counter() - started)
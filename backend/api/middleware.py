@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import is_shared_cache
+from .constants import SQL_LOGGED_FINGERPRINTS, SQL_SLOW_REQUEST_MS
+from .db_router import choose_replica, read_database
+from .instrumentation import QueryStats, current_stats
+
+logger = logging.getLogger(__name__)
+
+
+def get_pin_key(identity):
+    """Ключ привязки клиента к основной базе по его учетным данным."""
+    digest = hashlib.sha1(identity.encode('utf-8')).hexdigest()
+    return f'replica:pin:{digest}'
+
+
+def get_identity(request):
+    """Токен или сессия клиента из запроса, None для анонима."""
+    return (
+        request.headers.get('Authorization')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+
+
+def get_issued_identities(response):
+    """Учетные данные, выданные ответом: токен при входе или сессия."""
+    identities = []
+    data = getattr(response, 'data', None)
+    if isinstance(data, dict) and data.get('auth_token'):
+        identities.append(f'Token {data["auth_token"]}')
+    session = response.cookies.get(settings.SESSION_COOKIE_NAME)
+    if session is not None and session.value:
+        identities.append(session.value)
+    return identities
+
+
+def use_replicas():
+    """Есть ли реплики и общий кэш для привязки клиентов к основной базе.
+
+    Привязка, записанная в кэш в памяти процесса, не видна остальным
+    воркерам, поэтому без общего кэша все запросы идут в основную базу.
+    """
+    return bool(settings.DATABASE_REPLICAS) and is_shared_cache()
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Отправляет безопасные запросы вьюсетов с `use_read_replica` в реплику.
+
+    После успешного изменяющего запроса клиент на REPLICA_PIN_SECONDS
+    секунд привязывается к основной базе, чтобы видеть свои изменения.
+    Привязываются и учетные данные, выданные этим запросом: токен при
+    входе и сессия, - чтобы первые запросы после входа не читали
+    из отстающей реплики.
+    """
+
+    def process_request(self, request):
+        read_database.set(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method not in SAFE_METHODS
+            or not getattr(
+                getattr(view_func, 'cls', None), 'use_read_replica', False
+            )
+            or not use_replicas()
+        ):
+            return
+        identity = get_identity(request)
+        if identity is not None and cache.get(get_pin_key(identity)):
+            return
+        read_database.set(choose_replica())
+
+    def process_response(self, request, response):
+        read_database.set(None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and use_replicas()
+        ):
+            identities = [
+                get_identity(request), *get_issued_identities(response)
+            ]
+            cache.set_many(
+                {
+                    get_pin_key(identity): True
+                    for identity in identities if identity
+                },
+                settings.REPLICA_PIN_SECONDS,
+            )
+        return response
+
+
+class QueryInstrumentationMiddleware(MiddlewareMixin):
+    """Учет SQL-запросов для доли SQL_SAMPLE_RATE HTTP-запросов.
+
+    Добавляет заголовок Server-Timing и пишет в лог медленные запросы
+    и запросы с повторяющимися SQL (признак N+1) вместе с методами
+    сериализаторов, которые их выполняют.
+    """
+
+    def process_request(self, request):
+        stats = None
+        if random.random() < settings.SQL_SAMPLE_RATE:
+            stats = QueryStats()
+        request.query_stats = stats
+        current_stats.set(stats)
+
+    def process_response(self, request, response):
+        current_stats.set(None)
+        stats = getattr(request, 'query_stats', None)
+        if stats is None:
+            return response
+        total = (time.perf_counter() - stats.started) * 1000
+        db = stats.duration * 1000
+        response['Server-Timing'] = (
+            f'db;dur={db:.1f};desc="{stats.count} queries", '
+            f'total;dur={total:.1f}'
+        )
+        repeated = stats.repeated()
+        if repeated or total > SQL_SLOW_REQUEST_MS:
+            match = request.resolver_match
+            logger.warning(
+                '%s %s (%s): %d queries, db %.1f ms, total %.1f ms%s',
+                request.method,
+                request.path,
+                match.view_name if match else '-',
+                stats.count,
+                db,
+                total,
+                ''.join(
+                    f'\n  N+1? x{count} from '
+                    f'{", ".join(caller or "-" for caller in callers)}: '
+                    f'{sql[:200]}'
+                    for sql, count, callers
+                    in repeated[:SQL_LOGGED_FINGERPRINTS]
+                ),
+            )
+        return response
@@ -1,6 +1,18 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
 
-from .constants import PAGE_SIZE, PAGE_SIZE_QUERY_PARAM
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+from .constants import (
+    PAGE_SIZE,
+    PAGE_SIZE_QUERY_PARAM,
+    RECIPE_CURSOR_ORDERING,
+    USER_CURSOR_ORDERING,
+)
 
 
 class LimitPagination(PageNumberPagination):
@@ -8,3 +20,104 @@ class LimitPagination(PageNumberPagination):
 
     page_size = PAGE_SIZE
     page_size_query_param = PAGE_SIZE_QUERY_PARAM
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация рецептов по (pub_date, id)."""
+
+    page_size = PAGE_SIZE
+    page_size_query_param = PAGE_SIZE_QUERY_PARAM
+    ordering = RECIPE_CURSOR_ORDERING
+
+
+class UserCursorPagination(RecipeCursorPagination):
+    """Курсорная пагинация пользователей по username."""
+
+    ordering = USER_CURSOR_ORDERING
+
+
+class HybridPagination(LimitPagination):
+    """Пагинация `?page=&limit=` с опциональным курсорным режимом.
+
+    Курсорный режим включается параметром `cursor` (для первой страницы
+    можно передать пустое значение) и не выполняет COUNT(*) и OFFSET.
+    """
+
+    cursor_pagination_class = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+
+class RecipePagination(HybridPagination):
+    """Пагинация рецептов."""
+
+    cursor_pagination_class = RecipeCursorPagination
+
+
+class UserPagination(HybridPagination):
+    """Пагинация пользователей и подписок."""
+
+    cursor_pagination_class = UserCursorPagination
+
+
+class FeedPagination(CursorPagination):
+    """Курсорная пагинация ленты подписок.
+
+    Позиция курсора - дата публикации и id последнего рецепта страницы,
+    страница выбирается функцией, а не срезом queryset.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = PAGE_SIZE_QUERY_PARAM
+
+    def paginate_feed(self, request, get_page):
+        """Возвращает id рецептов страницы.
+
+        `get_page(limit, position)` возвращает пары (pub_date, id).
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.next_position = None
+        cursor = self.decode_cursor(request)
+        position = None
+        if cursor is not None and cursor.position:
+            try:
+                pub_date, pk = cursor.position.rsplit('|', 1)
+                position = (datetime.fromisoformat(pub_date), int(pk))
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+        rows = get_page(self.page_size + 1, position)
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            pub_date, pk = rows[-1]
+            self.next_position = f'{pub_date.isoformat()}|{pk}'
+        return [pk for _, pk in rows]
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.next_position)
+        )
+
+    def get_previous_link(self):
+        return None
@@ -0,0 +1,94 @@
+import json
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.datastructures import MultiValueDict
+from django.http.multipartparser import (
+    MultiPartParser as DjangoMultiPartParser,
+    MultiPartParserError,
+)
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+from recipes.constants import MAX_IMAGE_SIZE
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишет файл на диск и прерывает загрузку сверх MAX_IMAGE_SIZE."""
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > MAX_IMAGE_SIZE:
+            raise ParseError(
+                'Размер изображения не может быть больше '
+                f'{MAX_IMAGE_SIZE // (1024 * 1024)} МБ.'
+            )
+        return super().receive_data_chunk(raw_data, start)
+
+
+class FormData(dict):
+    """Поля формы, к которым DRF добавляет файлы в request.data.
+
+    DRF объединяет поля и файлы через copy() и update(), а update()
+    обычного словаря взял бы из MultiValueDict списки вместо файлов.
+    """
+
+    def copy(self):
+        return FormData(self)
+
+    def update(self, other=(), **kwargs):
+        if isinstance(other, MultiValueDict):
+            other = other.dict()
+        super().update(other, **kwargs)
+
+
+class StreamingMultiPartParser(MultiPartParser):
+    """Разбирает multipart/form-data, записывая файлы во временные файлы.
+
+    Файлы читаются из потока кусками и сразу пишутся на диск, поэтому
+    память не зависит от размера изображения. Поля со списками
+    (`list_fields`) передаются строкой JSON или повторяющимися полями
+    формы, остальные поля передаются как есть.
+    """
+
+    list_fields = ('ingredients', 'tags')
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        upload_handlers = [
+            LimitedTemporaryFileUploadHandler(request._request)
+        ]
+
+        try:
+            parser = DjangoMultiPartParser(
+                meta, stream, upload_handlers, encoding
+            )
+            data, files = parser.parse()
+        except MultiPartParserError as exc:
+            raise ParseError(f'Multipart form parse error - {exc}')
+        # request.data остается обычным словарем, а не QueryDict. Файлы
+        # возвращаются отдельно: Django закрывает и удаляет временные файлы
+        # из request.FILES по окончании запроса.
+        fields = FormData(data.dict())
+        for key in self.list_fields:
+            if key in data:
+                fields[key] = self.decode_list(key, data.getlist(key))
+        return DataAndFiles(fields, files)
+
+    def decode_list(self, key, values):
+        """Собирает список из повторяющихся полей и строк JSON."""
+        items = []
+        for value in values:
+            if value.lstrip().startswith(('[', '{')):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    raise ParseError(f'Некорректный JSON в поле {key}.')
+            if isinstance(value, list):
+                items.extend(value)
+            else:
+                items.append(value)
+        return items
@@ -0,0 +1,234 @@
+import threading
+from functools import reduce
+from operator import and_
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import IngredientInRecipe, Recipe
+from .cache import is_shared_cache
+from .constants import RECIPE_INDEX_CHANGE_TIMEOUT, RECIPE_INDEX_MAX_CHANGES
+from .db_router import use_primary
+
+# Номер последнего изменения в журнале изменений рецептов:
+CHANGES_SEQUENCE_KEY = 'recipes:index:sequence'
+
+
+def change_key(number):
+    """Ключ записи журнала изменений с id рецепта."""
+    return f'recipes:index:change:{number}'
+
+
+def get_sequence():
+    """Возвращает номер последнего изменения в журнале."""
+    sequence = cache.get(CHANGES_SEQUENCE_KEY)
+    if sequence is None:
+        cache.add(CHANGES_SEQUENCE_KEY, 0, None)
+        sequence = cache.get(CHANGES_SEQUENCE_KEY, 0)
+    return sequence
+
+
+def record_changes(recipe_ids):
+    """Записывает изменения рецептов в журнал после коммита.
+
+    Без общего кэша индекс не используется и журнал не ведется.
+    """
+    if not is_shared_cache():
+        return
+    recipe_ids = tuple(recipe_ids)
+
+    def record():
+        for recipe_id in recipe_ids:
+            get_sequence()
+            number = cache.incr(CHANGES_SEQUENCE_KEY)
+            cache.set(
+                change_key(number), recipe_id, RECIPE_INDEX_CHANGE_TIMEOUT
+            )
+
+    transaction.on_commit(record)
+
+
+def reset_index():
+    """Заставляет процессы перестроить индекс после коммита.
+
+    Номер изменения сдвигается дальше RECIPE_INDEX_MAX_CHANGES, поэтому
+    индекс перестраивается целиком, а не по журналу изменений.
+    """
+    if not is_shared_cache():
+        return
+
+    def reset():
+        get_sequence()
+        cache.incr(CHANGES_SEQUENCE_KEY, RECIPE_INDEX_MAX_CHANGES + 1)
+
+    transaction.on_commit(reset)
+
+
+def to_ids(bits):
+    """Переводит битовое множество в отсортированный список id."""
+    digits = bin(bits)[:1:-1]
+    ids = []
+    position = digits.find('1')
+    while position != -1:
+        ids.append(position)
+        position = digits.find('1', position + 1)
+    return ids
+
+
+def count_bits(bits):
+    """Кол-во рецептов в битовом множестве."""
+    return bin(bits).count('1')
+
+
+class RecipeIngredientIndex:
+    """Инвертированный индекс ингредиент -> рецепты в памяти процесса.
+
+    Множества рецептов хранятся как битовые маски в int, где номер бита
+    равен id рецепта. Перед каждым запросом процесс сверяет номер
+    последнего изменения в общем кэше и переиндексирует только
+    измененные рецепты, а при пропусках в журнале перестраивает индекс.
+    Журнал есть только в общем кэше, поэтому без него фильтры рецептов
+    обходятся без индекса.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.ingredients = {}
+        self.by_count = {}
+        self.recipes = 0
+        self.sequence = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Возвращает актуальный индекс."""
+        if self.sequence is not None and get_sequence() == self.sequence:
+            return self
+        with self.lock, use_primary():
+            sequence = get_sequence()
+            if self.sequence is None or not (
+                0 <= sequence - self.sequence <= RECIPE_INDEX_MAX_CHANGES
+            ):
+                self.rebuild()
+            elif sequence > self.sequence:
+                keys = [
+                    change_key(number)
+                    for number in range(self.sequence + 1, sequence + 1)
+                ]
+                changes = cache.get_many(keys)
+                if len(changes) < len(keys):
+                    self.rebuild()
+                else:
+                    self.update(set(changes.values()))
+            self.sequence = sequence
+        return self
+
+    def rebuild(self):
+        """Строит индекс по всем рецептам."""
+        postings = {}
+        ingredients = {}
+        rows = IngredientInRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).order_by()
+        for recipe_id, ingredient_id in rows.iterator():
+            postings[ingredient_id] = (
+                postings.get(ingredient_id, 0) | 1 << recipe_id
+            )
+            ingredients.setdefault(recipe_id, []).append(ingredient_id)
+        by_count = {}
+        for recipe_id, recipe_ingredients in ingredients.items():
+            count = len(recipe_ingredients)
+            by_count[count] = by_count.get(count, 0) | 1 << recipe_id
+        recipes = 0
+        for recipe_id in Recipe.objects.values_list('pk', flat=True):
+            recipes |= 1 << recipe_id
+        self.postings, self.ingredients, self.by_count, self.recipes = (
+            postings, ingredients, by_count, recipes
+        )
+
+    def update(self, recipe_ids):
+        """Переиндексирует измененные рецепты.
+
+        Меняются только множества ингредиентов, которые были в рецептах
+        до изменения или есть в них сейчас, и их кол-ва ингредиентов.
+        """
+        mask = 0
+        for recipe_id in recipe_ids:
+            mask |= 1 << recipe_id
+        postings = dict(self.postings)
+        ingredients = dict(self.ingredients)
+        by_count = dict(self.by_count)
+        touched = set()
+        counts = set()
+        for recipe_id in recipe_ids:
+            previous = ingredients.pop(recipe_id, ())
+            touched.update(previous)
+            if previous:
+                counts.add(len(previous))
+        for ingredient_id in touched:
+            postings[ingredient_id] &= ~mask
+        for count in counts:
+            by_count[count] &= ~mask
+        rows = IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id').order_by()
+        for recipe_id, ingredient_id in rows:
+            postings[ingredient_id] = (
+                postings.get(ingredient_id, 0) | 1 << recipe_id
+            )
+            ingredients.setdefault(recipe_id, []).append(ingredient_id)
+        for recipe_id in recipe_ids:
+            if recipe_id in ingredients:
+                count = len(ingredients[recipe_id])
+                by_count[count] = by_count.get(count, 0) | 1 << recipe_id
+        recipes = self.recipes & ~mask
+        for recipe_id in Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('pk', flat=True):
+            recipes |= 1 << recipe_id
+        self.postings, self.ingredients, self.by_count, self.recipes = (
+            postings, ingredients, by_count, recipes
+        )
+
+    def containing(self, ingredient_ids):
+        """Рецепты, в которых есть все указанные ингредиенты."""
+        return reduce(
+            and_,
+            (self.postings.get(pk, 0) for pk in ingredient_ids),
+            self.recipes,
+        )
+
+    def with_any(self, ingredient_ids):
+        """Рецепты, в которых есть хотя бы один из ингредиентов."""
+        bits = 0
+        for pk in ingredient_ids:
+            bits |= self.postings.get(pk, 0)
+        return bits
+
+    def cookable(self, ingredient_ids):
+        """Рецепты, все ингредиенты которых есть среди указанных.
+
+        Для каждого рецепта побитово складывается число его ингредиентов
+        из указанных, и сумма сравнивается с общим числом ингредиентов.
+        """
+        slices = []
+        for pk in set(ingredient_ids):
+            carry = self.postings.get(pk, 0)
+            for position, bits in enumerate(slices):
+                if not carry:
+                    break
+                slices[position], carry = bits ^ carry, bits & carry
+            if carry:
+                slices.append(carry)
+        result = 0
+        for count, bits in self.by_count.items():
+            if count.bit_length() > len(slices):
+                continue
+            for position, digit in enumerate(slices):
+                if not bits:
+                    break
+                bits &= digit if count >> position & 1 else ~digit
+            result |= bits
+        return result & self.recipes
+
+
+recipe_index = RecipeIngredientIndex()
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.models import Ingredient, Tag
+from .cache import bump_versions, get_versions, is_shared_cache
+from .constants import REFERENCE_CHECK_INTERVAL
+from .db_router import use_primary
+
+
+def make_etag(data):
+    """Строгий ETag для сериализуемых данных."""
+    content = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return '"{}"'.format(hashlib.sha1(content.encode('utf-8')).hexdigest())
+
+
+class ReferenceCache:
+    """Версионируемый кэш справочника в памяти процесса.
+
+    Данные хранятся в каждом процессе, а версия в общем кэше Django:
+    не чаще раза в REFERENCE_CHECK_INTERVAL секунд процесс сверяет
+    версию и перечитывает справочник, если он изменился. Версия в кэше
+    в памяти процесса не видна другим воркерам, поэтому без общего кэша
+    справочник перечитывается раз в REFERENCE_CHECK_INTERVAL секунд.
+    """
+
+    def __init__(self, queryset, fields, version_key):
+        self.queryset = queryset
+        self.fields = fields
+        self.version_key = version_key
+        self.version = None
+        self.checked_at = None
+        self.items = ()
+        self.by_id = {}
+        self.etag = None
+        self.lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # Кэш общий для процесса: поля сериализаторов не копируют его.
+        return self
+
+    def load(self):
+        """Возвращает актуальное состояние справочника."""
+        now = time.monotonic()
+        if (
+            self.checked_at is not None
+            and now - self.checked_at < REFERENCE_CHECK_INTERVAL
+        ):
+            return self
+        with self.lock, use_primary():
+            version = None
+            if is_shared_cache():
+                version, = get_versions(self.version_key)
+            if version is None or version != self.version:
+                items = tuple(self.queryset.values(*self.fields))
+                self.items = items
+                self.by_id = {item['id']: item for item in items}
+                self.etag = make_etag(items)
+                self.version = version
+            self.checked_at = now
+        return self
+
+    def get(self, pk):
+        """Возвращает запись справочника по id или None."""
+        return self.load().by_id.get(pk)
+
+    def invalidate(self):
+        """Обновляет версию справочника после коммита транзакции."""
+        transaction.on_commit(self.bump)
+
+    def bump(self):
+        bump_versions(self.version_key)
+        self.checked_at = None
+
+
+tags_reference = ReferenceCache(
+    Tag.objects.all(), ('id', 'name', 'slug'), 'reference:tags:version'
+)
+ingredients_reference = ReferenceCache(
+    Ingredient.objects.all(),
+    ('id', 'name', 'measurement_unit'),
+    'reference:ingredients:version',
+)
+
+
+def conditional_response(request, data, etag):
+    """Ответ с ETag или 304, если клиент прислал совпадающий ETag."""
+    headers = {'ETag': etag}
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
+
+
+class ReferenceViewSetMixin:
+    """Отдает справочник из памяти процесса с поддержкой ETag."""
+
+    reference = None
+
+    def list(self, request, *args, **kwargs):
+        reference = self.reference.load()
+        return conditional_response(request, reference.items, reference.etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            item = self.reference.get(int(kwargs[self.lookup_field]))
+        except (TypeError, ValueError):
+            item = None
+        if item is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(request, item, make_etag(item))
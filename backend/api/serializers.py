@@ -4,7 +4,13 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from drf_extra_fields.fields import Base64ImageField
 
-from recipes.constants import MIN_INGREDIENTS_AMOUNT, MAX_INGREDIENTS_AMOUNT
+from recipes import shopping_list
+from recipes.constants import (
+    MIN_INGREDIENTS_AMOUNT,
+    MAX_INGREDIENTS_AMOUNT,
+    RECIPE_IMAGE_VARIANTS,
+    AVATAR_IMAGE_VARIANTS,
+)
 from recipes.models import (
     Ingredient,
     Tag,
@@ -14,6 +20,30 @@ from recipes.models import (
     Favorite,
 )
 from users.models import User, Subscription
+from .constants import MAX_BULK_RECIPES
+from .fields import ImageVariantsField, LimitedHybridImageField
+from .reference import ingredients_reference, tags_reference
+from .subscriptions import get_recipes_limit, get_subscribed_author_ids
+
+
+class ReferenceRelatedField(serializers.PrimaryKeyRelatedField):
+    """Поле связи, проверяющее id по кэшу справочника."""
+
+    def __init__(self, reference, **kwargs):
+        self.reference = reference
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            item = self.reference.get(int(data))
+        except (TypeError, ValueError):
+            item = None
+        if item is None:
+            return super().to_internal_value(data)
+        queryset = self.get_queryset()
+        return queryset.model.from_db(
+            queryset.db, list(item), list(item.values())
+        )
 
 
 class UserSerializer(DjoserUserSerializer):
@@ -21,26 +51,31 @@ class UserSerializer(DjoserUserSerializer):
 
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField()
+    avatar_variants = ImageVariantsField(
+        source='avatar', variants=AVATAR_IMAGE_VARIANTS
+    )
 
     class Meta(DjoserUserSerializer.Meta):
         fields = DjoserUserSerializer.Meta.fields + (
             'is_subscribed',
-            'avatar'
+            'avatar',
+            'avatar_variants',
+            'subscribers_count',
+        )
+        read_only_fields = DjoserUserSerializer.Meta.read_only_fields + (
+            'subscribers_count',
         )
         ref_name = 'UniqueUserSerializer'
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and Subscription.objects.filter(user=user, author=obj).exists()
-        )
+        request = self.context.get('request')
+        return obj.id in get_subscribed_author_ids(request)
 
 
 class UserAvatarSerializer(UserSerializer):
     """Сериализатор для работы с аватаром пользователя."""
 
-    avatar = Base64ImageField()
+    avatar = LimitedHybridImageField()
 
     class Meta:
         model = User
@@ -51,10 +86,7 @@ class SubscriptionReceiveSerializer(UserSerializer):
     """Сериализатор для получения подписок."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        read_only=True,
-        default=0
-    )
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + (
@@ -64,15 +96,12 @@ class SubscriptionReceiveSerializer(UserSerializer):
 
     def get_recipes(self, obj):
         """Получить список рецептов."""
-        recipes = obj.recipes.all()
-        request = self.context.get('request')
-        if request:
-            recipes_limit = request.query_params.get('recipes_limit')
-            if recipes_limit:
-                try:
-                    recipes = recipes[:int(recipes_limit)]
-                except (ValueError, TypeError):
-                    pass
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
 
         return RecipeShortSerializer(
             recipes, context=self.context, many=True
@@ -133,12 +162,19 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         model = IngredientInRecipe
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
+    def to_representation(self, instance):
+        ingredient = ingredients_reference.get(instance.ingredient_id)
+        if ingredient is None:
+            return super().to_representation(instance)
+        return {**ingredient, 'amount': instance.amount}
+
 
 class AddIngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления ингредиентов в рецепт."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
+    id = ReferenceRelatedField(
+        reference=ingredients_reference,
+        queryset=Ingredient.objects.all(),
     )
     amount = serializers.IntegerField(
         min_value=MIN_INGREDIENTS_AMOUNT,
@@ -168,9 +204,13 @@ class TagSerializer(serializers.ModelSerializer):
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для получения краткой информации о рецепте."""
 
+    image_variants = ImageVariantsField(
+        source='image', variants=RECIPE_IMAGE_VARIANTS
+    )
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class RecipeReceiveSerializer(serializers.ModelSerializer):
@@ -186,6 +226,9 @@ class RecipeReceiveSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField(
+        source='image', variants=RECIPE_IMAGE_VARIANTS
+    )
 
     class Meta:
         model = Recipe
@@ -198,11 +241,17 @@ class RecipeReceiveSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
+            'favorites_count',
+            'shopping_carts_count',
         )
+        read_only_fields = ('favorites_count', 'shopping_carts_count')
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (
             request.user.is_authenticated
@@ -210,6 +259,8 @@ class RecipeReceiveSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (
             request.user.is_authenticated
@@ -224,12 +275,13 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         many=True,
         allow_empty=False,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = ReferenceRelatedField(
+        reference=tags_reference,
         queryset=Tag.objects.all(),
         many=True,
         allow_empty=False,
     )
-    image = Base64ImageField(
+    image = LimitedHybridImageField(
         allow_null=False,
         allow_empty_file=False,
     )
@@ -261,15 +313,57 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients', [])
-        tags = validated_data.pop('tags', [])
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
 
-        instance.ingredients.clear()
-        self.add_ingredient(ingredients=ingredients, recipe=instance)
-        instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(ingredients=ingredients, recipe=instance)
+        if tags is not None:
+            instance.tags.set(tags)
 
         return super().update(instance, validated_data)
 
+    def update_ingredients(self, ingredients, recipe):
+        """Применяет к ингредиентам рецепта только изменения."""
+        current = {
+            item.ingredient_id: item
+            for item in IngredientInRecipe.objects.select_for_update().filter(
+                recipe=recipe
+            )
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in current.items()
+        }
+        new_amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_update = []
+        for ingredient_id, item in current.items():
+            amount = new_amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                item.amount = amount
+                to_update.append(item)
+
+        IngredientInRecipe.objects.filter(
+            pk__in=[
+                item.pk for ingredient_id, item in current.items()
+                if ingredient_id not in new_amounts
+            ]
+        ).delete()
+        IngredientInRecipe.objects.bulk_update(to_update, ('amount',))
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in current
+        )
+        shopping_list.update_recipe(recipe.id, old_amounts, new_amounts)
+
     @transaction.atomic
     def add_ingredient(self, ingredients, recipe):
         IngredientInRecipe.objects.bulk_create(
@@ -342,3 +436,16 @@ class FavoriteSerializer(ShoppingCartFavoriteSerializer):
 
     class Meta(ShoppingCartFavoriteSerializer.Meta):
         model = Favorite
+
+
+class BulkRecipesSerializer(serializers.Serializer):
+    """Сериализатор списка рецептов для массовых операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES,
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,141 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.images import image_variants_ready
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.signals import data_imported
+from users.models import User
+from .authentication import invalidate_user_tokens
+from .cache import invalidate_recipes, invalidate_reference
+from .instrumentation import record_query
+from .recipe_index import record_changes, reset_index
+from .reference import ingredients_reference, tags_reference
+
+# Поля пользователя, которые попадают в ответы с рецептами:
+AUTHOR_FIELDS = frozenset(
+    ('email', 'username', 'first_name', 'last_name', 'avatar')
+)
+
+# Поля пользователя, изменение которых не сбрасывает снимки токенов:
+TOKEN_IGNORED_FIELDS = frozenset(('last_login',))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    """Обновляет индекс и сбрасывает кэш при изменении рецепта."""
+    record_changes((instance.pk,))
+    invalidate_recipes((instance.pk,))
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    """Обновляет индекс и сбрасывает кэш при изменении ингредиентов."""
+    record_changes((instance.recipe_id,))
+    invalidate_recipes((instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Обновляет индекс при изменении ингредиентов рецепта."""
+    if not reverse:
+        if action.startswith('post_'):
+            record_changes((instance.pk,))
+    elif action == 'pre_clear':
+        record_changes(instance.recipes.values_list('pk', flat=True))
+    elif action.startswith('post_') and pk_set:
+        record_changes(pk_set)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Сбрасывает кэш при изменении тегов или ингредиентов рецепта."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipes((instance.pk,))
+    elif pk_set:
+        invalidate_recipes(pk_set)
+    else:
+        invalidate_reference()
+
+
+@receiver(data_imported, sender=Recipe)
+def recipes_imported(sender, **kwargs):
+    """Перестраивает индекс и сбрасывает кэш после загрузки рецептов."""
+    reset_index()
+    invalidate_reference()
+
+
+@receiver(data_imported, sender=Tag)
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Сбрасывает кэш тегов и всех рецептов."""
+    tags_reference.invalidate()
+    invalidate_reference()
+
+
+@receiver(data_imported, sender=Ingredient)
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Сбрасывает кэш ингредиентов и всех рецептов."""
+    ingredients_reference.invalidate()
+    invalidate_reference()
+
+
+@receiver((post_save, post_delete), sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    """Сбрасывает кэш рецептов автора при изменении его данных."""
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    if kwargs.get('created'):
+        return
+    invalidate_recipes(
+        Recipe.objects.filter(author=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_tokens_changed(sender, instance, update_fields=None, **kwargs):
+    """Сбрасывает снимки токенов при изменении пользователя.
+
+    Покрывает смену пароля, деактивацию и изменение профиля.
+    """
+    if kwargs.get('created'):
+        return
+    if update_fields is not None and set(update_fields) <= (
+        TOKEN_IGNORED_FIELDS
+    ):
+        return
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Сбрасывает снимки токенов при выходе или удалении токена."""
+    invalidate_user_tokens(instance.user_id)
+
+
+@receiver(image_variants_ready, sender=Recipe)
+def recipe_image_variants_ready(sender, pk, **kwargs):
+    """Сбрасывает кэш рецепта, когда готовы варианты изображения."""
+    invalidate_recipes((pk,))
+
+
+@receiver(image_variants_ready, sender=User)
+def avatar_variants_ready(sender, pk, **kwargs):
+    """Сбрасывает кэш рецептов автора, когда готовы варианты аватара."""
+    invalidate_recipes(
+        Recipe.objects.filter(author_id=pk).values_list('pk', flat=True)
+    )
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """Подключает учет SQL-запросов к новому соединению с БД."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,33 @@
+from users.models import Subscription
+
+
+def get_subscribed_author_ids(request):
+    """Возвращает id авторов, на которых подписан пользователь запроса.
+
+    Подписки загружаются одним запросом и сохраняются на объекте запроса,
+    поэтому все вложенные сериализаторы отвечают на `is_subscribed`
+    без обращений к БД.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+    author_ids = getattr(request, '_subscribed_author_ids', None)
+    if author_ids is None:
+        author_ids = frozenset(
+            Subscription.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        )
+        request._subscribed_author_ids = author_ids
+    return author_ids
+
+
+def get_recipes_limit(request):
+    """Возвращает значение `recipes_limit` из запроса или None."""
+    if request is None:
+        return None
+    try:
+        recipes_limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError, TypeError):
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import (
+    CachedTokenAuthentication,
+    token_cache,
+    token_cache_key,
+)
+from .utils import SharedCacheMixin, create_user
+
+
+class TokenCacheTestBase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+        cls.key = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self):
+        user, _ = self.authentication.authenticate_credentials(self.key)
+        return user
+
+
+class LocalCacheTest(TokenCacheTestBase):
+    """Кэш в памяти процесса: снимки не используются."""
+
+    def test_every_request_reads_database(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), self.user)
+        self.assertEqual(token_cache.items, {})
+
+
+class SharedCacheTest(SharedCacheMixin, TokenCacheTestBase):
+    """Общий кэш: снимок в процессе и сброс по версии пользователя."""
+
+    def test_snapshot_is_reused(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertIn('password', user.get_deferred_fields())
+
+    def test_logout_revokes_snapshot(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(key=self.key).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivation_revokes_snapshot(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(TOKEN_CACHE_SHARED=True)
+    def test_shared_cache_stores_only_user_id(self):
+        self.authenticate()
+        user_id, _ = cache.get(token_cache_key(self.key))
+        self.assertEqual(user_id, self.user.pk)
+
+        token_cache.clear()
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertIn('password', user.get_deferred_fields())
@@ -0,0 +1,119 @@
+import threading
+
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from rest_framework import status
+
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from .utils import (
+    APITestBase,
+    TempMediaMixin,
+    create_ingredients,
+    create_recipe,
+    create_user,
+    get_client,
+)
+
+
+class BulkRecipesTest(APITestBase):
+    """Массовое добавление в избранное и список покупок."""
+
+    def setUp(self):
+        super().setUp()
+        flour, sugar, _ = self.ingredients
+        self.first = create_recipe(self.author, ((flour, 100),))
+        self.second = create_recipe(self.author, ((flour, 50), (sugar, 5)))
+
+    def test_statuses_and_counters(self):
+        Favorite.objects.create(user=self.user, recipe=self.first)
+        response = self.client.post(
+            '/api/recipes/favorite/',
+            {'recipes': [self.first.pk, self.second.pk, 999999]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['status'] for item in response.data],
+            ['exists', 'added', 'not_found'],
+        )
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(self.first.favorites_count, 1)
+        self.assertEqual(self.second.favorites_count, 1)
+
+    def test_shopping_list_amounts(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.first)
+        self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'recipes': [self.first.pk, self.second.pk]},
+            format='json',
+        )
+        amounts = dict(
+            ShoppingListItem.objects.filter(user=self.user).values_list(
+                'ingredient__name', 'total_amount'
+            )
+        )
+        self.assertEqual(amounts, {'мука': 150, 'сахар': 5})
+
+    def test_delete(self):
+        Favorite.objects.create(user=self.user, recipe=self.first)
+        response = self.client.delete(
+            '/api/recipes/favorite/',
+            {'recipes': [self.first.pk, self.second.pk]},
+            format='json',
+        )
+        self.assertEqual(
+            [item['status'] for item in response.data],
+            ['removed', 'not_found'],
+        )
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.favorites_count, 0)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentBulkRecipesTest(TempMediaMixin, TransactionTestCase):
+    """Одновременное добавление одних и тех же рецептов."""
+
+    def setUp(self):
+        flour, sugar = create_ingredients('мука', 'сахар')
+        self.recipe = create_recipe(
+            create_user(1), ((flour, 100), (sugar, 5)), image=''
+        )
+        self.client = get_client(create_user(2))
+
+    def test_rows_are_counted_once(self):
+        barrier = threading.Barrier(4)
+        responses = []
+
+        def add(url):
+            try:
+                barrier.wait()
+                responses.append(self.client.post(
+                    url, {'recipes': [self.recipe.pk]}, format='json'
+                ))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=add, args=(url,))
+            for url in ('/api/recipes/favorite/',
+                        '/api/recipes/shopping_cart/') * 2
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_200_OK] * 4,
+        )
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.shopping_carts_count, 1)
+        self.assertEqual(
+            dict(ShoppingListItem.objects.values_list(
+                'ingredient__name', 'total_amount'
+            )),
+            {'мука': 100, 'сахар': 5},
+        )
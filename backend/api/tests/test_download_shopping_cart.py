@@ -0,0 +1,41 @@
+from rest_framework import status
+
+from recipes import shopping_list
+from recipes.models import ShoppingCart
+from .utils import APITestBase, create_recipe
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class DownloadShoppingCartTest(APITestBase):
+    """Выгрузка списка покупок."""
+
+    def setUp(self):
+        super().setUp()
+        flour, sugar, _ = self.ingredients
+        recipe = create_recipe(self.author, ((flour, 100), (sugar, 20)))
+        ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        shopping_list.rebuild()
+
+    def test_body_does_not_query_database(self):
+        """Под ASGI тело ответа формируется в цикле событий без БД."""
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            content = b''.join(response.streaming_content).decode()
+        self.assertIn('мука 100 г', content)
+        self.assertIn('сахар 20 г', content)
+
+    def test_formats(self):
+        for file_format, expected in (
+            ('csv', 'мука,100,г'),
+            ('json', '"name": "мука", "amount": 100'),
+        ):
+            with self.subTest(file_format=file_format):
+                response = self.client.get(URL, {'format': file_format})
+                content = b''.join(response.streaming_content).decode()
+                self.assertIn(expected, content)
+
+    def test_unknown_format(self):
+        response = self.client.get(URL, {'format': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,69 @@
+import io
+import json
+
+from PIL import Image
+from rest_framework import status
+
+from .utils import APITestBase
+
+
+def get_image():
+    """Файл PNG для загрузки формой."""
+    file = io.BytesIO()
+    Image.new('RGB', (10, 10), 'red').save(file, 'PNG')
+    file.name = 'image.png'
+    file.seek(0)
+    return file
+
+
+class MultiPartRecipeTest(APITestBase):
+    """Создание рецепта формой multipart/form-data."""
+
+    def post(self, **fields):
+        flour = self.ingredients[0]
+        data = {
+            'ingredients': json.dumps([{'id': flour.pk, 'amount': 3}]),
+            'tags': [tag.pk for tag in self.tags],
+            'image': get_image(),
+            'name': 'Каша',
+            'text': 'Описание',
+            'cooking_time': 5,
+            **fields,
+        }
+        return self.client.post('/api/recipes/', data, format='multipart')
+
+    def test_lists_from_json_and_repeated_fields(self):
+        response = self.post()
+        self.assertEqual(
+            response.status_code, status.HTTP_201_CREATED, response.data
+        )
+        self.assertEqual(len(response.data['tags']), 2)
+        self.assertEqual(response.data['ingredients'][0]['amount'], 3)
+
+    def test_single_repeated_field_is_list(self):
+        response = self.post(tags=self.tags[0].pk)
+        self.assertEqual(
+            response.status_code, status.HTTP_201_CREATED, response.data
+        )
+        self.assertEqual(
+            [tag['id'] for tag in response.data['tags']], [self.tags[0].pk]
+        )
+
+    def test_text_fields_are_not_decoded(self):
+        response = self.post(name='[Завтрак] Каша', text='{без сахара}')
+        self.assertEqual(
+            response.status_code, status.HTTP_201_CREATED, response.data
+        )
+        self.assertEqual(response.data['name'], '[Завтрак] Каша')
+        self.assertEqual(response.data['text'], '{без сахара}')
+
+    def test_invalid_json_in_list_field(self):
+        response = self.post(ingredients='[{"id": ')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_uploaded_file_closed_after_request(self):
+        response = self.post(name='Каша с фото')
+        self.assertEqual(
+            response.status_code, status.HTTP_201_CREATED, response.data
+        )
+        self.assertTrue(response.wsgi_request.FILES['image'].closed)
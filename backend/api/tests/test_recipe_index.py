@@ -0,0 +1,146 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.recipe_index import (
+    RecipeIngredientIndex,
+    count_bits,
+    recipe_index,
+    to_ids,
+)
+from recipes.models import IngredientInRecipe
+from .utils import APITestBase, SharedCacheMixin, create_recipe
+
+
+class RecipeFilterTestBase(APITestBase):
+    """Рецепты с ингредиентами для фильтров."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # Журнал изменений пишется после коммита, которого в тесте нет.
+        recipe_index.sequence = None
+        self.flour, self.sugar, self.salt = self.ingredients
+        self.bread = create_recipe(
+            self.author, ((self.flour, 500), (self.salt, 5)), name='Хлеб'
+        )
+        self.candy = create_recipe(
+            self.author, ((self.sugar, 100),), name='Леденец'
+        )
+        self.cake = create_recipe(
+            self.author, ((self.flour, 200), (self.sugar, 100)), name='Торт'
+        )
+        self.water = create_recipe(self.author, name='Вода')
+
+    def get_names(self, query):
+        response = self.client.get(f'/api/recipes/?{query}&limit=100')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['name'] for recipe in response.data['results']}
+
+    def assert_filters(self):
+        flour, sugar, salt = self.flour.pk, self.sugar.pk, self.salt.pk
+        for query, names in (
+            (f'ingredients={flour}', {'Хлеб', 'Торт'}),
+            (f'ingredients={flour},{sugar}', {'Торт'}),
+            (f'exclude_ingredients={sugar}', {'Хлеб', 'Вода'}),
+            (f'exclude_ingredients={flour},{salt}', {'Леденец', 'Вода'}),
+            (f'available={flour},{sugar}', {'Леденец', 'Торт'}),
+            (f'available={flour},{salt},{sugar}', {'Хлеб', 'Леденец', 'Торт'}),
+            (f'available={salt}', set()),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.get_names(query), names)
+
+    def get_filter_sql(self, query):
+        """SQL анонимного запроса: без подзапросов is_favorited и др."""
+        self.client.credentials()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_names(query)
+        return ' '.join(query['sql'] for query in queries)
+
+
+class RecipeIndexTest(SharedCacheMixin, RecipeFilterTestBase):
+    """Фильтры рецептов по ингредиентам через индекс в памяти."""
+
+    def test_filters(self):
+        self.assert_filters()
+
+    def test_small_result_uses_ids(self):
+        sql = self.get_filter_sql(f'ingredients={self.flour.pk}')
+        self.assertIn('"recipes_recipe"."id" IN (', sql)
+        self.assertNotIn('EXISTS', sql)
+
+    def test_large_result_paginated_from_ids(self):
+        with mock.patch('api.filters.RECIPE_INDEX_MAX_IDS', 0):
+            self.assert_filters()
+            self.client.credentials()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    f'/api/recipes/?exclude_ingredients={self.salt.pk}'
+                    '&limit=2&page=2'
+                )
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [recipe['name'] for recipe in response.data['results']],
+            ['Леденец'],
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('EXISTS', sql)
+
+    def test_large_result_with_other_filters(self):
+        other = create_recipe(
+            self.user, ((self.flour, 100),), name='Чужой хлеб'
+        )
+        with mock.patch('api.filters.RECIPE_INDEX_MAX_IDS', 0):
+            response = self.client.get(
+                f'/api/recipes/?ingredients={self.flour.pk}'
+                f'&author={self.user.pk}'
+            )
+            cursor = self.client.get(
+                f'/api/recipes/?ingredients={self.flour.pk}&cursor=&limit=1'
+            )
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['id'], other.pk)
+        self.assertEqual(cursor.data['results'][0]['id'], other.pk)
+        self.assertIsNotNone(cursor.data['next'])
+
+    def test_bits(self):
+        bits = recipe_index.load().containing([self.flour.pk])
+        self.assertEqual(to_ids(bits), [self.bread.pk, self.cake.pk])
+        self.assertEqual(count_bits(bits), 2)
+
+    def test_update_touches_changed_ingredients(self):
+        index = RecipeIngredientIndex()
+        index.rebuild()
+        # Большое число, чтобы любая операция над ним дала новый объект.
+        index.postings[self.flour.pk] |= 1 << 1000
+        flour = index.postings[self.flour.pk]
+        IngredientInRecipe.objects.filter(recipe=self.candy).delete()
+        IngredientInRecipe.objects.create(
+            recipe=self.candy, ingredient=self.salt, amount=1
+        )
+        index.update({self.candy.pk})
+        expected = RecipeIngredientIndex()
+        expected.rebuild()
+        for ingredient in (self.sugar, self.salt):
+            self.assertEqual(
+                index.postings[ingredient.pk], expected.postings[ingredient.pk]
+            )
+        self.assertEqual(index.by_count, expected.by_count)
+        self.assertIs(index.postings[self.flour.pk], flour)
+
+
+class LocalCacheRecipeFilterTest(RecipeFilterTestBase):
+    """Без общего кэша фильтры выполняются подзапросами без индекса."""
+
+    def test_filters(self):
+        with mock.patch.object(recipe_index, 'load') as load:
+            self.assert_filters()
+        load.assert_not_called()
+
+    def test_uses_subqueries(self):
+        sql = self.get_filter_sql(f'ingredients={self.flour.pk}')
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('"recipes_recipe"."id" IN (', sql)
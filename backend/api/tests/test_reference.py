@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.reference import tags_reference
+from recipes.models import Tag
+from .utils import SharedCacheMixin
+
+
+class ReferenceCacheTestBase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+        tags_reference.checked_at = None
+
+    def get_name(self):
+        return tags_reference.get(self.tag.pk)['name']
+
+    def rename_without_signals(self):
+        """Меняет тег в обход сигналов и ждет следующей сверки."""
+        self.get_name()
+        Tag.objects.filter(pk=self.tag.pk).update(name='Обед')
+        tags_reference.checked_at = None
+
+
+class SharedCacheReferenceTest(SharedCacheMixin, ReferenceCacheTestBase):
+    """Общий кэш: справочник перечитывается при смене версии."""
+
+    def test_reloaded_on_version_change(self):
+        self.rename_without_signals()
+        self.assertEqual(self.get_name(), 'Завтрак')
+        tags_reference.bump()
+        self.assertEqual(self.get_name(), 'Обед')
+
+
+class LocalCacheReferenceTest(ReferenceCacheTestBase):
+    """Кэш в памяти процесса: справочник перечитывается при сверке."""
+
+    def test_reloaded_on_check(self):
+        self.rename_without_signals()
+        self.assertEqual(self.get_name(), 'Обед')
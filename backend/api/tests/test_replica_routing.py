@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.response import Response
+
+from api.checks import check_replicas_cache
+from api.db_router import ReplicaRouter, read_database, use_primary
+from api.middleware import ReplicaRoutingMiddleware
+from api.views import RecipeViewSet
+from recipes.models import Recipe
+from .utils import SharedCacheMixin
+
+REPLICA = 'replica_1'
+
+recipes_view = RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTest(SharedCacheMixin, SimpleTestCase):
+    """Чтение из реплики и привязка клиента к основной базе."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.addCleanup(read_database.set, None)
+
+    def run_request(self, method, status=200, view=recipes_view,
+                    token='first', data=None):
+        """База чтения во время выполнения вьюхи."""
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        request = getattr(self.factory, method)('/', **headers)
+        seen = []
+
+        def get_response(request):
+            seen.append(read_database.get())
+            return Response(data, status=status)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware.process_request(request)
+        middleware.process_view(request, view, (), {})
+        middleware.process_response(request, get_response(request))
+        self.assertIsNone(read_database.get())
+        return seen[0]
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.run_request('get'), REPLICA)
+        self.assertIsNone(self.run_request('post', status=201))
+
+    def test_view_without_replica_flag(self):
+        self.assertIsNone(self.run_request('get', view=HttpResponse))
+
+    def test_client_pinned_after_write(self):
+        self.run_request('post', status=201)
+        self.assertIsNone(self.run_request('get'))
+        self.assertEqual(self.run_request('get', token='second'), REPLICA)
+
+    def test_failed_write_does_not_pin(self):
+        self.run_request('post', status=400)
+        self.assertEqual(self.run_request('get'), REPLICA)
+
+    def test_token_issued_by_login_is_pinned(self):
+        self.run_request('post', token=None, data={'auth_token': 'new'})
+        self.assertIsNone(self.run_request('get', token='new'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertIsNone(self.run_request('get'))
+
+    def test_router_and_use_primary(self):
+        router = ReplicaRouter()
+        read_database.set(REPLICA)
+        self.assertEqual(router.db_for_read(Recipe), REPLICA)
+        with use_primary():
+            self.assertIsNone(router.db_for_read(Recipe))
+        self.assertEqual(router.db_for_read(Recipe), REPLICA)
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicasWithoutSharedCacheTest(SimpleTestCase):
+    """Без общего кэша реплики не используются."""
+
+    def test_reads_from_primary(self):
+        request = RequestFactory().get('/')
+        middleware = ReplicaRoutingMiddleware(lambda request: None)
+        middleware.process_view(request, recipes_view, (), {})
+        self.assertIsNone(read_database.get())
+
+    def test_check_reports_error(self):
+        self.assertEqual(
+            [error.id for error in check_replicas_cache(None)], ['api.E001']
+        )
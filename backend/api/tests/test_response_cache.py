@@ -0,0 +1,89 @@
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.cache import (
+    RECIPES_VERSION_KEY,
+    REFERENCE_VERSION_KEY,
+    get_versions,
+    recipe_version_key,
+)
+from recipes.images import image_variants_ready
+from recipes.models import Recipe
+from users.models import User
+from .utils import APITestBase, SharedCacheMixin, create_recipe
+
+
+class RecipeResponseCacheTest(SharedCacheMixin, APITestBase):
+    """Кэш ответов с рецептами для анонимных пользователей."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = create_recipe(self.author, name='Старое название')
+        self.anonymous = APIClient()
+
+    def get_name(self, path):
+        response = self.anonymous.get(path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['name']
+
+    def rename(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.get(pk=self.recipe.pk)
+            recipe.name = name
+            recipe.save()
+
+    def test_padded_id_uses_same_version(self):
+        paths = (
+            f'/api/recipes/{self.recipe.pk}/',
+            f'/api/recipes/0{self.recipe.pk}/',
+        )
+        for path in paths:
+            self.assertEqual(self.get_name(path), 'Старое название')
+        self.rename('Новое название')
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual(self.get_name(path), 'Новое название')
+
+    def test_cached_until_version_bumped(self):
+        path = f'/api/recipes/{self.recipe.pk}/'
+        self.get_name(path)
+        Recipe.objects.filter(pk=self.recipe.pk).update(name='Без сигнала')
+        self.assertEqual(self.get_name(path), 'Старое название')
+
+    def test_not_numeric_id(self):
+        response = self.anonymous.get('/api/recipes/abc/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class LocalCacheResponseTest(APITestBase):
+    """Кэш в памяти процесса: ответы не кэшируются."""
+
+    def test_not_cached(self):
+        recipe = create_recipe(self.author, name='Старое название')
+        anonymous = APIClient()
+        path = f'/api/recipes/{recipe.pk}/'
+        anonymous.get(path)
+        Recipe.objects.filter(pk=recipe.pk).update(name='Без сигнала')
+        self.assertEqual(anonymous.get(path).data['name'], 'Без сигнала')
+
+
+class AvatarVariantsTest(APITestBase):
+    """Готовые варианты аватара сбрасывают кэш только рецептов автора."""
+
+    def test_only_author_recipes_invalidated(self):
+        own = create_recipe(self.author)
+        other = create_recipe(self.user)
+        keys = (
+            RECIPES_VERSION_KEY,
+            REFERENCE_VERSION_KEY,
+            recipe_version_key(own.pk),
+            recipe_version_key(other.pk),
+        )
+        before = get_versions(*keys)
+        with self.captureOnCommitCallbacks(execute=True):
+            image_variants_ready.send(sender=User, pk=self.author.pk)
+        after = get_versions(*keys)
+        self.assertEqual(
+            [old != new for old, new in zip(before, after)],
+            [True, False, True, False],
+        )
@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+# Картинка рецептов в тестах: файл не нужен, пока его не отдают.
+TEST_IMAGE = 'recipes/images/test.png'
+
+
+def create_user(number):
+    """Создает пользователя с номером в имени."""
+    return User.objects.create_user(
+        username=f'user_{number}',
+        email=f'user_{number}@example.com',
+        first_name='Имя',
+        last_name='Фамилия',
+        password='test-password',
+    )
+
+
+def create_recipe(author, ingredients=(), tags=(), name='Рецепт',
+                  image=TEST_IMAGE):
+    """Создает рецепт с ингредиентами [(ингредиент, кол-во)] и тегами."""
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Описание',
+        image=image,
+        cooking_time=10,
+    )
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients
+    )
+    recipe.tags.set(tags)
+    return recipe
+
+
+def create_ingredients(*names):
+    """Создает ингредиенты в граммах."""
+    return [
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in names
+    ]
+
+
+def get_client(user):
+    """Клиент с токеном пользователя."""
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+class TempMediaMixin:
+    """Файлы, сохраненные тестами, пишутся во временный MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        cls.addClassCleanup(media.disable)
+        super().setUpClass()
+
+
+class SharedCacheMixin:
+    """Файловый кэш, общий для всех процессов, в отличие от LocMemCache."""
+
+    @classmethod
+    def setUpClass(cls):
+        location = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, location, ignore_errors=True)
+        caches = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }})
+        caches.enable()
+        cls.addClassCleanup(caches.disable)
+        super().setUpClass()
+
+
+class APITestBase(TempMediaMixin, APITestCase):
+    """Пользователи, теги и ингредиенты для тестов API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = create_user(1), create_user(2)
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag_{number}')
+            for number in range(2)
+        ]
+        cls.ingredients = create_ingredients('мука', 'сахар', 'соль')
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import async_urlpatterns
+from .constants import ASYNC_URL_NAMES
 from .views import (
     UserViewSet,
     IngredientViewSet,
@@ -22,7 +25,11 @@ router_v1.register(
     'tags', TagViewSet, basename='tags'
 )
 
+router_urls = router_v1.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_urlpatterns(router_urls, ASYNC_URL_NAMES)
+
 urlpatterns = [
-    path('', include(router_v1.urls)),
+    path('', include(router_urls)),
     re_path(r'^auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,9 +1,16 @@
-from io import BytesIO
-
-from django.http import FileResponse
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Count
+from django.db.models import (
+    BooleanField,
+    Exists,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value,
+    prefetch_related_objects,
+)
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import (
     filters,
@@ -12,6 +19,7 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
@@ -23,14 +31,35 @@ from recipes.models import (
     Ingredient,
     Tag,
     Recipe,
-    IngredientInRecipe,
     ShoppingCart,
+    ShoppingListItem,
     Favorite,
 )
-from .download_shopping_cart import download_txt
+from recipes.signals import recipes_bulk_added
+from recipes.timeline import get_feed
+from .cache import AnonymousCacheMixin
+from .download_shopping_cart import (
+    DOWNLOAD_FORMATS,
+    DownloadContentNegotiation,
+)
 from users.models import User, Subscription
 from .permissions import IsAdminOrAuthor
-from .pagination import LimitPagination
+from .subscriptions import get_recipes_limit
+from .parsers import StreamingMultiPartParser
+from .pagination import (
+    FeedPagination,
+    LimitPagination,
+    RecipePagination,
+    UserPagination,
+)
+from .reference import (
+    ReferenceViewSetMixin,
+    conditional_response,
+    ingredients_reference,
+    make_etag,
+    tags_reference,
+)
+from .ingredient_search import get_ingredient_index
 from .filters import IngredientFilter, RecipeFilter
 from .serializers import (
     UserSerializer,
@@ -43,6 +72,7 @@ from .serializers import (
     FavoriteSerializer,
     ShoppingCartSerializer,
     UserAvatarSerializer,
+    BulkRecipesSerializer,
 )
 
 
@@ -52,7 +82,8 @@ class UserViewSet(DjoserUserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (AllowAny,)
-    pagination_class = LimitPagination
+    pagination_class = UserPagination
+    use_read_replica = True
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
 
@@ -72,6 +103,7 @@ class UserViewSet(DjoserUserViewSet):
     @action(
         methods=('PUT',),
         permission_classes=(IsAuthenticated,),
+        parser_classes=(JSONParser, StreamingMultiPartParser),
         url_path='me/avatar',
         detail=False
     )
@@ -100,17 +132,18 @@ class UserViewSet(DjoserUserViewSet):
 
     @action(
         detail=False,
-        pagination_class=LimitPagination,
+        pagination_class=UserPagination,
         permission_classes=(IsAuthenticated,),
     )
     def subscriptions(self, request):
         """Возвращает все подписки пользователя."""
         queryset = User.objects.filter(
             subscribed_to__user=request.user
-        ).annotate(recipes_count=Count('recipes')).order_by('username')
+        ).order_by('username')
 
         page = self.paginate_queryset(queryset)
         if page is not None:
+            self.prefetch_limited_recipes(page, request)
             serializer = SubscriptionReceiveSerializer(
                 page, many=True, context={'request': request}
             )
@@ -121,6 +154,25 @@ class UserViewSet(DjoserUserViewSet):
         )
         return Response(serializer.data)
 
+    def prefetch_limited_recipes(self, authors, request):
+        """Загружает рецепты всех авторов страницы одним запросом.
+
+        С `recipes_limit` для каждого автора выбираются только первые
+        N рецептов с помощью коррелированного подзапроса.
+        """
+        recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:recipes_limit]
+            ))
+        prefetch_related_objects(
+            authors,
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
     @action(
         detail=True,
         methods=('POST',),
@@ -158,7 +210,7 @@ class UserViewSet(DjoserUserViewSet):
         )
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReferenceViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для ингредиентов."""
 
     queryset = Ingredient.objects.all()
@@ -167,30 +219,63 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny,)
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
+    reference = ingredients_reference
+    use_read_replica = True
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get(IngredientFilter.search_param)
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        ingredients = get_ingredient_index().search(name)
+        return conditional_response(
+            request, ingredients, make_etag(ingredients)
+        )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReferenceViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
+    reference = tags_reference
+    use_read_replica = True
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
 
     queryset = Recipe.objects.all().select_related(
         'author'
     ).prefetch_related(
-        'tags', 'ingredients_in_recipe__ingredient'
+        'tags', 'ingredients_in_recipe'
     )
     permission_classes = (IsAdminOrAuthor, IsAuthenticatedOrReadOnly)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = LimitPagination
+    pagination_class = RecipePagination
+    parser_classes = (JSONParser, StreamingMultiPartParser)
     http_method_names = ('get', 'post', 'patch', 'delete')
+    use_read_replica = True
+
+    def get_queryset(self):
+        """Добавляет флаги избранного и списка покупок для всей выборки."""
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+        )
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
@@ -239,36 +324,119 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         methods=('GET',),
         permission_classes=(IsAuthenticated,),
-        detail=False
+        detail=False,
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """Лента рецептов авторов из подписок по дате публикации."""
+        ids = self.paginator.paginate_feed(
+            request,
+            lambda limit, position: get_feed(
+                request.user.id, limit, position
+            ),
+        )
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=('GET',),
+        detail=False,
+    )
+    def cookable(self, request):
+        """Рецепты, которые можно приготовить из ингредиентов `available`."""
+        if not request.query_params.get('available'):
+            return Response(
+                {'available': 'Укажите id имеющихся ингредиентов.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.list(request)
+
+    @action(
+        methods=('POST',),
+        permission_classes=(IsAuthenticated,),
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+    )
+    def bulk_shopping_cart(self, request):
+        """Добавление нескольких рецептов в список покупок."""
+        return self.bulk_add_recipes(request, ShoppingCart)
+
+    @bulk_shopping_cart.mapping.delete
+    def bulk_delete_from_shopping_cart(self, request):
+        """Удаление нескольких рецептов из списка покупок."""
+        return self.bulk_delete_recipes(request, ShoppingCart)
+
+    @action(
+        methods=('POST',),
+        permission_classes=(IsAuthenticated,),
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-bulk',
+    )
+    def bulk_favorite(self, request):
+        """Добавление нескольких рецептов в избранное."""
+        return self.bulk_add_recipes(request, Favorite)
+
+    @bulk_favorite.mapping.delete
+    def bulk_delete_from_favorite(self, request):
+        """Удаление нескольких рецептов из избранного."""
+        return self.bulk_delete_recipes(request, Favorite)
+
+    @action(
+        methods=('GET',),
+        permission_classes=(IsAuthenticated,),
+        detail=False,
+        content_negotiation_class=DownloadContentNegotiation,
     )
     def download_shopping_cart(self, request):
-        """Загрузка списка покупок файлом."""
+        """Загрузка списка покупок файлом в формате txt, csv или json."""
         user = request.user
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shoppingcarts__user=user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(
-            total_amount=Sum('amount')
-        ).order_by('ingredient__name')
-
-        content = download_txt(ingredients, user=user.username)
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in DOWNLOAD_FORMATS:
+            return Response(
+                {'errors': 'Поддерживаемые форматы: '
+                 f'{", ".join(DOWNLOAD_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        download, content_type = DOWNLOAD_FORMATS[file_format]
 
-        file_content = BytesIO(content.encode('utf-8'))
+        # Строки читаются до ответа: под ASGI Django перебирает потоковый
+        # ответ в цикле событий, где запросы к БД запрещены.
+        ingredients = list(ShoppingListItem.objects.filter(
+            user=user
+        ).values(
+            'ingredient__name', 'ingredient__measurement_unit', 'total_amount'
+        ).order_by('ingredient__name'))
 
-        response = FileResponse(
-            file_content,
-            content_type='text/plain; charset=utf-8'
+        response = StreamingHttpResponse(
+            download(ingredients, user=user.username),
+            content_type=content_type
         )
         response['Content-Disposition'] = (
-            f'attachment; filename="shopping_cart_{user.username}.txt"'
+            'attachment; '
+            f'filename="shopping_cart_{user.username}.{file_format}"'
         )
 
         return response
 
+    def lock_user(self, user):
+        """Блокирует строку пользователя до конца транзакции.
+
+        Избранное и список покупок одного пользователя меняются
+        по очереди, поэтому проверка записей перед вставкой или удалением
+        не устаревает, и счетчики не меняются дважды.
+        """
+        User.objects.select_for_update().filter(pk=user.pk).exists()
+
+    @transaction.atomic
     def add_recipe(self, request, pk, serializer_class):
         """Добавление рецепта в избранное или в список покупок."""
         recipe = get_object_or_404(Recipe, pk=pk)
+        self.lock_user(request.user)
 
         data = {
             'user': request.user.id,
@@ -283,9 +451,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def delete_recipe(self, request, pk, model):
         """Удаление рецепта из избранного или списка покупок."""
         user = request.user
+        self.lock_user(user)
 
         deleted_count, _ = model.objects.filter(
             recipe_id=pk, user=user
@@ -297,3 +467,70 @@ class RecipeViewSet(viewsets.ModelViewSet):
             {'errors': 'Рецепт не найден в списке.'},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    def get_bulk_recipe_ids(self, request):
+        """Возвращает список id рецептов из тела запроса."""
+        serializer = BulkRecipesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    @transaction.atomic
+    def bulk_add_recipes(self, request, model):
+        """Добавление нескольких рецептов в избранное или список покупок.
+
+        Рецепты и уже добавленные записи проверяются одним запросом
+        под блокировкой пользователя, новые записи вставляются одним
+        INSERT, поэтому сигнал получает только действительно вставленные.
+        """
+        user = request.user
+        recipe_ids = self.get_bulk_recipe_ids(request)
+        self.lock_user(user)
+
+        found = dict(
+            Recipe.objects.filter(pk__in=recipe_ids).annotate(
+                is_added=Exists(
+                    model.objects.filter(user=user, recipe=OuterRef('pk'))
+                )
+            ).values_list('pk', 'is_added')
+        )
+        added = [
+            recipe_id for recipe_id in recipe_ids
+            if recipe_id in found and not found[recipe_id]
+        ]
+        model.objects.bulk_create(
+            model(user=user, recipe_id=recipe_id) for recipe_id in added
+        )
+        recipes_bulk_added.send(
+            sender=model, user_id=user.id, recipe_ids=added
+        )
+
+        return Response([
+            {
+                'id': recipe_id,
+                'status': (
+                    'not_found' if recipe_id not in found
+                    else 'exists' if found[recipe_id]
+                    else 'added'
+                ),
+            }
+            for recipe_id in recipe_ids
+        ])
+
+    @transaction.atomic
+    def bulk_delete_recipes(self, request, model):
+        """Удаление нескольких рецептов из избранного или списка покупок."""
+        recipe_ids = self.get_bulk_recipe_ids(request)
+        self.lock_user(request.user)
+        entries = model.objects.filter(
+            user=request.user, recipe_id__in=recipe_ids
+        )
+        removed = set(entries.values_list('recipe_id', flat=True))
+        entries.delete()
+
+        return Response([
+            {
+                'id': recipe_id,
+                'status': 'removed' if recipe_id in removed else 'not_found',
+            }
+            for recipe_id in recipe_ids
+        ])
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,6 +40,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -61,6 +63,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
+# Асинхронные представления чтения, включаются при запуске через ASGI:
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', '').lower() in ('1', 'true')
+
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', 32))
+
 if os.getenv('USE_SQLITE'):
     DATABASES = {
         'default': {
@@ -80,6 +87,45 @@ else:
         }
     }
 
+# Реплики для чтения: файлы SQLite или хосты PostgreSQL (host:port).
+# Используются только с общим для воркеров CACHE_BACKEND (api.E001):
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if os.getenv('USE_SQLITE'):
+        DATABASES[alias]['NAME'] = replica
+    else:
+        host, _, port = replica.partition(':')
+        DATABASES[alias]['HOST'] = host
+        DATABASES[alias]['PORT'] = port or DATABASES['default']['PORT']
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ('api.db_router.ReplicaRouter',)
+
+# Сколько секунд после изменения читать из основной базы:
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+# Доля запросов, для которых считаются SQL-запросы (0 - выключено):
+SQL_SAMPLE_RATE = float(os.getenv('SQL_SAMPLE_RATE', 0.01))
+
+# Снимки токенов работают только с общим для воркеров CACHE_BACKEND;
+# при TOKEN_CACHE_SHARED id пользователя по хешу токена хранится в нем:
+TOKEN_CACHE_SHARED = os.getenv('TOKEN_CACHE_SHARED', '').lower() in (
+    '1', 'true'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -121,7 +167,7 @@ REST_FRAMEWORK = {
     ),
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -9,6 +9,8 @@ from .models import (
     ShoppingCart,
     Favorite,
     IngredientInRecipe,
+    ShoppingListItem,
+    TimelineEntry,
 )
 
 admin.site.empty_value_display = 'Здесь пока ничего нет:('
@@ -20,6 +22,7 @@ class IngredientInRecipeInline(admin.TabularInline):
     model = IngredientInRecipe
     extra = EXTRA
     min_num = MIN_NUM
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Ingredient)
@@ -34,7 +37,7 @@ class IngredientAdmin(admin.ModelAdmin):
         'name',
     )
     list_filter = (
-        'name',
+        'measurement_unit',
     )
 
 
@@ -62,7 +65,8 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'author',
         'name',
-        'recipe_favorite_additions',
+        'favorites_count',
+        'shopping_carts_count',
         'recipe_ingredients',
         'recipe_tags',
         'recipe_image',
@@ -70,6 +74,10 @@ class RecipeAdmin(admin.ModelAdmin):
     list_editable = (
         'name',
     )
+    readonly_fields = (
+        'favorites_count',
+        'shopping_carts_count',
+    )
     search_fields = (
         'author__username',
         'name',
@@ -77,12 +85,19 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = (
         'tags',
     )
+    list_select_related = (
+        'author',
+    )
+    autocomplete_fields = (
+        'author',
+    )
+    show_full_result_count = False
     inlines = (IngredientInRecipeInline,)
 
-    @admin.display(description='Добавлений в избранное')
-    def recipe_favorite_additions(self, recipe):
-        """Считает кол-во добавлений рецепта в избранное."""
-        return recipe.favorites.all().count()
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'tags', 'ingredients'
+        )
 
     @admin.display(description='Ингредиенты')
     def recipe_ingredients(self, recipe):
@@ -113,11 +128,18 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'recipe',
     )
     search_fields = (
+        'user__username',
+        'recipe__name',
+    )
+    list_select_related = (
         'user',
+        'recipe',
     )
-    list_filter = (
+    autocomplete_fields = (
         'user',
+        'recipe',
     )
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
@@ -129,8 +151,66 @@ class FavoriteAdmin(admin.ModelAdmin):
         'recipe',
     )
     search_fields = (
+        'user__username',
+        'recipe__name',
+    )
+    list_select_related = (
         'user',
+        'recipe',
     )
-    list_filter = (
+    autocomplete_fields = (
+        'user',
+        'recipe',
+    )
+    show_full_result_count = False
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    """Админ панель для итогов списков покупок."""
+
+    list_display = (
+        'user',
+        'ingredient',
+        'total_amount',
+    )
+    search_fields = (
+        'user__username',
+        'ingredient__name',
+    )
+    list_select_related = (
+        'user',
+        'ingredient',
+    )
+    autocomplete_fields = (
+        'user',
+        'ingredient',
+    )
+    show_full_result_count = False
+
+
+@admin.register(TimelineEntry)
+class TimelineEntryAdmin(admin.ModelAdmin):
+    """Админ панель для лент подписок."""
+
+    list_display = (
         'user',
+        'recipe',
+        'author',
+        'pub_date',
+    )
+    search_fields = (
+        'user__username',
+        'recipe__name',
+    )
+    list_select_related = (
+        'user',
+        'recipe',
+        'author',
+    )
+    autocomplete_fields = (
+        'user',
+        'recipe',
+        'author',
     )
+    show_full_result_count = False
@@ -63,3 +63,59 @@ EXTRA = 0
 MIN_NUM = 1
 
 # ----------------->
+
+# КОНСТАНТЫ ДЛЯ ИЗОБРАЖЕНИЙ
+# <-----------------
+
+# Максимальный размер загружаемого изображения в байтах:
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+
+# Максимальное кол-во пикселей загружаемого изображения:
+MAX_IMAGE_PIXELS = 25_000_000
+
+# Кол-во процессов для обработки изображений:
+IMAGE_WORKERS = 2
+
+# Варианты изображения рецепта: наибольшая сторона и формат:
+RECIPE_IMAGE_VARIANTS = {
+    'card': (480, 'JPEG'),
+    'detail': (1280, 'JPEG'),
+    'webp': (1280, 'WEBP'),
+}
+
+# Варианты аватара: наибольшая сторона и формат:
+AVATAR_IMAGE_VARIANTS = {
+    'card': (128, 'JPEG'),
+    'webp': (128, 'WEBP'),
+}
+
+# ----------------->
+
+# КОНСТАНТЫ ДЛЯ ПОЛНОТЕКСТОВОГО ПОИСКА
+# <-----------------
+
+# Конфигурация полнотекстового поиска PostgreSQL:
+SEARCH_CONFIG = 'russian'
+
+# Таблица FTS5 для поиска рецептов в SQLite:
+SEARCH_FTS_TABLE = 'recipes_recipe_search'
+
+# Веса названия и описания рецепта в bm25 (SQLite):
+SEARCH_FTS_WEIGHTS = (10.0, 1.0)
+
+# ----------------->
+
+# КОНСТАНТЫ ДЛЯ ЛЕНТЫ ПОДПИСОК
+# <-----------------
+
+# Максимальная длина ленты пользователя:
+TIMELINE_MAX_LENGTH = 500
+
+# Лента пользователя обрезается примерно раз в столько новых записей:
+TIMELINE_TRIM_EVERY = 50
+
+# Рецепты авторов с большим числом подписчиков не рассылаются по лентам,
+# а читаются при запросе ленты:
+FANOUT_MAX_FOLLOWERS = 1000
+
+# ----------------->
@@ -0,0 +1,41 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Subscription, User
+from .models import Favorite, Recipe, ShoppingCart
+
+# Счетчики: модель, поле, связанная модель и поле связи.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+)
+
+
+def count_subquery(model, field_name):
+    """Подзапрос с кол-вом связанных объектов."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field_name: OuterRef('pk')}
+        ).order_by().values(field_name).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def reconcile():
+    """Исправляет расхождения счетчиков.
+
+    Возвращает кол-во исправленных строк для каждого счетчика.
+    """
+    fixed = {}
+    for model, counter, related_model, field_name in COUNTERS:
+        expected = count_subquery(related_model, field_name)
+        drifted = model.objects.annotate(
+            expected=expected
+        ).exclude(**{counter: F('expected')})
+        fixed[f'{model.__name__}.{counter}'] = model.objects.filter(
+            pk__in=drifted.values('pk')
+        ).update(**{counter: expected})
+    return fixed
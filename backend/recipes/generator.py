@@ -0,0 +1,294 @@
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from users.models import Subscription, User
+from . import shopping_list, timeline
+from .constants import MAX_RECIPE_NAME_LEN, RECIPE_IMAGE_VARIANTS
+from .counters import reconcile
+from .images import make_variants
+from .models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from .signals import data_imported
+
+# Пароль всех сгенерированных пользователей:
+GENERATED_PASSWORD = 'generated-password'
+
+# Картинка, общая для всех сгенерированных рецептов:
+PLACEHOLDER_IMAGE = 'recipes/images/generated.png'
+
+# Слова для названий и описаний рецептов:
+DISHES = (
+    'Суп', 'Салат', 'Пирог', 'Рагу', 'Омлет', 'Каша', 'Запеканка',
+    'Паста', 'Плов', 'Блины', 'Котлеты', 'Соус', 'Смузи', 'Десерт',
+)
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Петр', 'Ольга', 'Сергей', 'Елена')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев')
+
+
+def batches(items, batch_size):
+    """Разбивает поток объектов на пачки."""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_create(model, objects, batch_size):
+    """Создает объекты пачками, возвращает кол-во добавленных.
+
+    Дубликаты пропускаются (`ignore_conflicts`), а bulk_create не
+    сообщает, сколько строк вставлено, поэтому строки считаются до и после.
+    """
+    before = model.objects.count()
+    for batch in batches(objects, batch_size):
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+    return model.objects.count() - before
+
+
+class ZipfSampler:
+    """Выбор элементов с вероятностью, обратной степени их ранга.
+
+    По умолчанию элементы ранжируются в случайном порядке, поэтому
+    популярность не зависит от id; с `shuffle=False` ранг - порядок
+    элементов в `items`.
+    """
+
+    def __init__(self, items, exponent, rng, shuffle=True):
+        self.items = list(items)
+        if shuffle:
+            rng.shuffle(self.items)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.items) + 1)
+        ))
+        self.rng = rng
+
+    def choice(self):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def sample(self, count, exclude=None):
+        """До `count` различных элементов, кроме `exclude`."""
+        count = min(count, len(self.items) - (exclude is not None))
+        chosen = set()
+        attempts = count * 10
+        while len(chosen) < count and attempts:
+            chosen.update(
+                self.rng.choices(
+                    self.items,
+                    cum_weights=self.cum_weights,
+                    k=count - len(chosen),
+                )
+            )
+            chosen.discard(exclude)
+            attempts -= 1
+        return chosen
+
+
+def sample_count(rng, mean):
+    """Кол-во связей у пользователя с экспоненциальным распределением."""
+    return int(rng.expovariate(1 / mean)) if mean > 0 else 0
+
+
+@contextmanager
+def explicit_pub_date():
+    """Позволяет задать дату публикации рецепта при создании."""
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def get_placeholder_image():
+    """Создает картинку и ее варианты для сгенерированных рецептов."""
+    if not default_storage.exists(PLACEHOLDER_IMAGE):
+        content = io.BytesIO()
+        Image.new('RGB', (640, 480), (230, 160, 60)).save(content, 'PNG')
+        default_storage.save(
+            PLACEHOLDER_IMAGE, ContentFile(content.getvalue())
+        )
+        make_variants(
+            default_storage.path(PLACEHOLDER_IMAGE),
+            PLACEHOLDER_IMAGE,
+            RECIPE_IMAGE_VARIANTS,
+        )
+    return PLACEHOLDER_IMAGE
+
+
+def create_users(count, batch_size):
+    """Создает пользователей, возвращает их id."""
+    start = User.objects.aggregate(last=Max('pk'))['last'] or 0
+    password = make_password(GENERATED_PASSWORD)
+    bulk_create(
+        User,
+        (
+            User(
+                username=f'generated_{number}',
+                email=f'generated_{number}@example.com',
+                first_name=FIRST_NAMES[number % len(FIRST_NAMES)],
+                last_name=LAST_NAMES[number % len(LAST_NAMES)],
+                password=password,
+            )
+            for number in range(start + 1, start + count + 1)
+        ),
+        batch_size,
+    )
+    return list(
+        User.objects.filter(pk__gt=start).order_by('pk').values_list(
+            'pk', flat=True
+        )
+    )
+
+
+def create_recipes(authors, count, rng, days, batch_size):
+    """Создает рецепты авторов, возвращает их id."""
+    start = Recipe.objects.aggregate(last=Max('pk'))['last'] or 0
+    image = get_placeholder_image()
+    now = timezone.now()
+    ingredient_names = list(
+        Ingredient.objects.order_by('pk').values_list('name', flat=True)[:1000]
+    )
+    with explicit_pub_date():
+        bulk_create(
+            Recipe,
+            (
+                Recipe(
+                    author_id=authors.choice(),
+                    name=(
+                        f'{rng.choice(DISHES)} '
+                        f'с {rng.choice(ingredient_names)}'
+                    )[:MAX_RECIPE_NAME_LEN],
+                    text=' '.join(rng.sample(ingredient_names, 5)),
+                    image=image,
+                    cooking_time=rng.randint(5, 180),
+                    pub_date=now - timedelta(days=rng.uniform(0, days)),
+                )
+                for _ in range(count)
+            ),
+            batch_size,
+        )
+    return list(
+        Recipe.objects.filter(pk__gt=start).order_by('pk').values_list(
+            'pk', flat=True
+        )
+    )
+
+
+def create_recipe_relations(recipe_ids, rng, exponent, batch_size):
+    """Добавляет рецептам ингредиенты и теги, возвращает их кол-во."""
+    ingredients = ZipfSampler(
+        Ingredient.objects.order_by('pk').values_list('pk', flat=True),
+        exponent,
+        rng,
+    )
+    tag_ids = list(Tag.objects.values_list('pk', flat=True))
+    ingredients_count = bulk_create(
+        IngredientInRecipe,
+        (
+            IngredientInRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in ingredients.sample(
+                round(rng.triangular(3, 15, 7))
+            )
+        ),
+        batch_size,
+    )
+    tags_count = bulk_create(
+        Recipe.tags.through,
+        (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(
+                tag_ids, min(len(tag_ids), rng.randint(1, 3))
+            )
+        ),
+        batch_size,
+    )
+    return ingredients_count, tags_count
+
+
+def create_user_relations(model, field, user_ids, sampler, mean, rng,
+                          batch_size, exclude_self=False):
+    """Связывает пользователей с популярными рецептами или авторами."""
+    return bulk_create(
+        model,
+        (
+            model(user_id=user_id, **{f'{field}_id': pk})
+            for user_id in user_ids
+            for pk in sampler.sample(
+                sample_count(rng, mean),
+                exclude=user_id if exclude_self else None,
+            )
+        ),
+        batch_size,
+    )
+
+
+@transaction.atomic
+def generate(users, recipes, favorites, carts, subscriptions, exponent=1.1,
+             seed=0, days=365, batch_size=1000):
+    """Создает синтетические данные, возвращает кол-во объектов.
+
+    Авторство рецептов, добавления в избранное и список покупок
+    и подписки распределены по закону Ципфа с показателем `exponent`:
+    немногие авторы и рецепты собирают большую часть активности.
+    `favorites`, `carts` и `subscriptions` - среднее кол-во связей
+    у одного пользователя. При одинаковом `seed` данные повторяются.
+    """
+    if not Ingredient.objects.exists() or not Tag.objects.exists():
+        raise ValueError(
+            'Сначала загрузите ингредиенты и теги командой import_data'
+        )
+    rng = random.Random(seed)
+    user_ids = create_users(users, batch_size)
+    authors = ZipfSampler(user_ids, exponent, rng)
+    recipe_ids = create_recipes(authors, recipes, rng, days, batch_size)
+    ingredients_count, tags_count = create_recipe_relations(
+        recipe_ids, rng, exponent, batch_size
+    )
+    popular = ZipfSampler(recipe_ids, exponent, rng)
+    counts = {
+        'users': len(user_ids),
+        'recipes': len(recipe_ids),
+        'recipe ingredients': ingredients_count,
+        'recipe tags': tags_count,
+        'favorites': create_user_relations(
+            Favorite, 'recipe', user_ids, popular, favorites, rng, batch_size
+        ),
+        'shopping carts': create_user_relations(
+            ShoppingCart, 'recipe', user_ids, popular, carts, rng, batch_size
+        ),
+        'subscriptions': create_user_relations(
+            Subscription, 'author', user_ids, authors, subscriptions, rng,
+            batch_size, exclude_self=True,
+        ),
+    }
+    # bulk_create не вызывает сигналы: производные данные пересобираются.
+    reconcile()
+    counts['shopping list items'] = shopping_list.rebuild()
+    counts['timeline entries'] = timeline.rebuild()
+    data_imported.send(sender=Recipe)
+    return counts
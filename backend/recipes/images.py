@@ -0,0 +1,131 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.dispatch import Signal
+from PIL import Image, features
+
+from .constants import IMAGE_WORKERS, MAX_IMAGE_PIXELS, MAX_IMAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Расширения файлов для форматов вариантов:
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'WEBP': 'webp',
+}
+
+# Отправляется, когда варианты изображения записаны на диск.
+image_variants_ready = Signal()
+
+_executor = None
+
+
+def check_image(file):
+    """Проверяет размер файла и кол-во пикселей до сохранения."""
+    if file.size > MAX_IMAGE_SIZE:
+        raise ValidationError(
+            'Размер изображения не может быть больше '
+            f'{MAX_IMAGE_SIZE // (1024 * 1024)} МБ.'
+        )
+    file.seek(0)
+    with Image.open(file) as image:
+        width, height = image.size
+    file.seek(0)
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ValidationError(
+            'Изображение не может содержать больше '
+            f'{MAX_IMAGE_PIXELS} пикселей.'
+        )
+
+
+def get_variant_name(name, variant, image_format):
+    """Имя файла варианта рядом с оригиналом."""
+    directory, file_name = os.path.split(name)
+    stem, _ = os.path.splitext(file_name)
+    return os.path.join(
+        directory, 'variants', f'{stem}_{variant}.{EXTENSIONS[image_format]}'
+    )
+
+
+def make_variants(path, name, variants):
+    """Создает уменьшенные копии изображения, выполняется в пуле процессов.
+
+    Файл сначала пишется во временный, затем переименовывается, чтобы
+    частично записанный вариант не был отдан клиенту.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    root = path[:-len(name)]
+    with Image.open(path) as original:
+        original.load()
+        for variant, (max_side, image_format) in variants.items():
+            if image_format == 'WEBP' and not features.check('webp'):
+                continue
+            variant_path = root + get_variant_name(name, variant, image_format)
+            os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+            image = original.copy()
+            image.thumbnail((max_side, max_side))
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            temp_path = f'{variant_path}.tmp'
+            image.save(temp_path, image_format, quality=85)
+            os.replace(temp_path, variant_path)
+
+
+def get_executor():
+    """Пул процессов, создается при первой задаче."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _executor
+
+
+def has_variants(field_file, variants):
+    """Проверяет, созданы ли варианты изображения."""
+    return all(
+        field_file.storage.exists(
+            get_variant_name(field_file.name, variant, image_format)
+        )
+        for variant, (_, image_format) in variants.items()
+        if image_format != 'WEBP' or features.check('webp')
+    )
+
+
+def schedule_variants(instance, field_file, variants):
+    """Ставит создание вариантов в очередь после коммита транзакции."""
+    if not field_file or has_variants(field_file, variants):
+        return
+    model, pk = type(instance), instance.pk
+    path, name = field_file.path, field_file.name
+
+    def done(future):
+        error = future.exception()
+        if error is not None:
+            logger.error('Не удалось обработать изображение %s: %s',
+                         name, error)
+            return
+        image_variants_ready.send(sender=model, pk=pk)
+
+    transaction.on_commit(lambda: get_executor().submit(
+        make_variants, path, name, variants
+    ).add_done_callback(done))
+
+
+def get_variant_urls(field_file, variants):
+    """Адреса вариантов; пока вариант не готов, отдается оригинал."""
+    if not field_file:
+        return None
+    urls = {}
+    for variant, (_, image_format) in variants.items():
+        name = get_variant_name(field_file.name, variant, image_format)
+        urls[variant] = (
+            field_file.storage.url(name)
+            if field_file.storage.exists(name) else field_file.url
+        )
+    return urls
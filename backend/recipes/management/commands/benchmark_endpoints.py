@@ -0,0 +1,315 @@
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.generator import DISHES, ZipfSampler
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Subscription, User
+
+# Замеряемые адреса: название, шаблон адреса и нужна ли авторизация.
+# Подстановки в шаблоне выбираются для каждого запроса заново.
+ENDPOINTS = (
+    ('recipes-list', '/api/recipes/', False),
+    ('recipes-list-auth', '/api/recipes/', True),
+    ('recipes-tags', '/api/recipes/?tags={tag}', False),
+    ('recipes-search', '/api/recipes/?search={word}', False),
+    ('recipes-ingredients', '/api/recipes/?ingredients={ingredient}', False),
+    ('recipes-favorited', '/api/recipes/?is_favorited=1', True),
+    ('recipes-in-cart', '/api/recipes/?is_in_shopping_cart=1', True),
+    ('recipes-cookable', '/api/recipes/cookable/?available={pantry}', False),
+    ('recipes-detail', '/api/recipes/{recipe}/', False),
+    ('recipes-detail-auth', '/api/recipes/{recipe}/', True),
+    ('recipes-feed', '/api/recipes/feed/', True),
+    ('download-shopping-cart', '/api/recipes/download_shopping_cart/', True),
+    ('users-list', '/api/users/', False),
+    ('users-detail', '/api/users/{author}/', True),
+    ('users-me', '/api/users/me/', True),
+    ('subscriptions', '/api/users/subscriptions/', True),
+    ('tags-list', '/api/tags/', False),
+    ('ingredients-search', '/api/ingredients/?name={prefix}', False),
+)
+
+# Кол-во ингредиентов «в наличии» для подбора рецептов:
+PANTRY_SIZE = 30
+
+# Показатели, которые сравниваются с предыдущим запуском:
+COMPARED = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'memory_kib')
+
+
+def get_git_revision():
+    """Коммит и наличие незакоммиченных изменений в рабочей копии."""
+    try:
+        commit = subprocess.run(
+            ('git', 'rev-parse', 'HEAD'),
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ('git', 'status', '--porcelain', '--untracked-files=no'),
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def get_dataset():
+    """Объем данных, на котором выполнялся замер."""
+    return {
+        model.__name__: model.objects.count()
+        for model in (
+            User, Recipe, Ingredient, Tag, Favorite, ShoppingCart,
+            Subscription,
+        )
+    }
+
+
+@contextmanager
+def quiet_logger(name):
+    """Отключает логгер на время замера."""
+    logger = logging.getLogger(name)
+    disabled = logger.disabled
+    logger.disabled = True
+    try:
+        yield
+    finally:
+        logger.disabled = disabled
+
+
+class Placeholders:
+    """Значения подстановок в адресах с популярностью по Ципфу."""
+
+    def __init__(self, rng, exponent):
+        self.rng = rng
+        self.recipes = ZipfSampler(
+            Recipe.objects.order_by('-favorites_count', 'pk').values_list(
+                'pk', flat=True
+            ),
+            exponent, rng, shuffle=False,
+        )
+        self.authors = ZipfSampler(
+            User.objects.order_by('-subscribers_count', 'pk').values_list(
+                'pk', flat=True
+            ),
+            exponent, rng, shuffle=False,
+        )
+        self.ingredients = ZipfSampler(
+            Ingredient.objects.annotate(
+                used=Count('ingredients_in_recipe')
+            ).order_by('-used', 'pk').values_list('pk', 'name'),
+            exponent, rng, shuffle=False,
+        )
+        self.tags = list(Tag.objects.values_list('slug', flat=True))
+
+    def __getitem__(self, key):
+        if key == 'recipe':
+            return self.recipes.choice()
+        if key == 'author':
+            return self.authors.choice()
+        if key == 'ingredient':
+            return self.ingredients.choice()[0]
+        if key == 'pantry':
+            return ','.join(
+                str(pk) for pk, _ in self.ingredients.sample(PANTRY_SIZE)
+            )
+        if key == 'prefix':
+            return self.ingredients.choice()[1][:2]
+        if key == 'tag':
+            return self.rng.choice(self.tags)
+        if key == 'word':
+            return self.rng.choice(DISHES)
+        raise KeyError(key)
+
+    def resolve(self, template):
+        return template.format_map(self)
+
+
+class Command(BaseCommand):
+    """Замер основных адресов API внутри процесса.
+
+    Запросы выполняются тестовым клиентом Django без сети, поэтому
+    результаты отражают время приложения и БД. Для каждого адреса
+    считаются перцентили задержки, кол-во SQL-запросов и пиковое
+    выделение памяти на запрос. Результат с номером коммита и объемом
+    данных сохраняется в json и сравнивается с предыдущим запуском.
+    """
+
+    help = 'Измеряет задержки, SQL-запросы и память основных адресов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Кол-во замеряемых запросов на каждый адрес',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=20,
+            help='Кол-во запросов для прогрева перед замером',
+        )
+        parser.add_argument(
+            '--memory-requests', type=int, default=20,
+            help='Кол-во запросов для замера памяти (tracemalloc)',
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            choices=[name for name, *_ in ENDPOINTS],
+            help='Название адреса, можно указать несколько раз',
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель популярности рецептов и авторов в запросах',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора случайных чисел',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл json для сохранения результатов',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Файл json предыдущего запуска для сравнения',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('Нужно хотя бы 2 запроса на адрес')
+        if not Recipe.objects.exists():
+            raise CommandError(
+                'Нет рецептов: сначала выполните команду generate_data'
+            )
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        user = User.objects.annotate(
+            subscriptions=Count('subscriber')
+        ).order_by('-subscriptions', 'pk').first()
+        token, _ = Token.objects.get_or_create(user=user)
+        placeholders = Placeholders(
+            random.Random(options['seed']), options['zipf']
+        )
+        selected = options['endpoints']
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            SQL_SAMPLE_RATE=1,
+        ), quiet_logger('api.middleware'):
+            for name, template, auth in ENDPOINTS:
+                if selected and name not in selected:
+                    continue
+                client = Client(raise_request_exception=False)
+                if auth:
+                    client.defaults['HTTP_AUTHORIZATION'] = (
+                        f'Token {token.key}'
+                    )
+                results[name] = self.run_endpoint(
+                    client, template, placeholders, options
+                )
+                self.write_result(
+                    name, results[name],
+                    baseline['endpoints'].get(name) if baseline else None,
+                )
+
+        commit, dirty = get_git_revision()
+        report = {
+            'commit': commit,
+            'dirty': dirty,
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'options': {
+                key: options[key]
+                for key in ('requests', 'warmup', 'memory_requests', 'zipf',
+                            'seed')
+            },
+            'dataset': get_dataset(),
+            'endpoints': results,
+        }
+        if baseline and baseline['dataset'] != report['dataset']:
+            self.stdout.write(self.style.WARNING(
+                'Объем данных отличается от сравниваемого запуска: '
+                f'{baseline["dataset"]}'
+            ))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'RESULTS SAVED TO {options["output"]}'
+            ))
+
+    def run_endpoint(self, client, template, placeholders, options):
+        """Замеряет один адрес, возвращает показатели."""
+        for _ in range(options['warmup']):
+            client.get(placeholders.resolve(template))
+
+        latencies, queries, errors = [], [], 0
+        for _ in range(options['requests']):
+            path = placeholders.resolve(template)
+            started = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - started)
+            stats = getattr(response.wsgi_request, 'query_stats', None)
+            queries.append(stats.count if stats else 0)
+            errors += response.status_code >= 400
+
+        memory = []
+        for _ in range(options['memory_requests']):
+            path = placeholders.resolve(template)
+            # Отдельный замер на запрос: пик считается с начала замера
+            # (tracemalloc.reset_peak нет в Python 3.8).
+            tracemalloc.start()
+            try:
+                client.get(path)
+                memory.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+            'p50_ms': round(quantiles[49] * 1000, 2),
+            'p95_ms': round(quantiles[94] * 1000, 2),
+            'p99_ms': round(quantiles[98] * 1000, 2),
+            'queries': statistics.median(queries),
+            'queries_max': max(queries),
+            'memory_kib': (
+                round(statistics.median(memory) / 1024, 1) if memory else None
+            ),
+        }
+
+    def write_result(self, name, result, baseline=None):
+        """Печатает показатели адреса и изменение относительно прошлого."""
+        parts = []
+        for key in COMPARED:
+            value = result[key]
+            part = f'{key} {value}'
+            old = baseline.get(key) if baseline else None
+            if value is not None and old:
+                part += f' ({(value - old) / old:+.0%})'
+            parts.append(part)
+        style = self.style.ERROR if result['errors'] else self.style.SUCCESS
+        self.stdout.write(
+            f'{name}: ' + ', '.join(parts)
+            + style(f', errors {result["errors"]}')
+        )
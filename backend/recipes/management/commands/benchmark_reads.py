@@ -0,0 +1,96 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+# Запросы чтения, которые сравниваются между развертываниями:
+READ_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=20&cursor=',
+    '/api/tags/',
+    '/api/ingredients/?name=мо',
+    '/api/users/me/',
+)
+
+
+class Command(BaseCommand):
+    """Нагрузочный тест запросов чтения к запущенному серверу.
+
+    Запускается против синхронного (gunicorn + wsgi) и асинхронного
+    (gunicorn + uvicorn worker + asgi) развертывания с одинаковыми
+    параметрами, чтобы сравнить пропускную способность и задержки.
+    """
+
+    help = 'Измеряет RPS и задержки запросов чтения к серверу'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Адрес сервера',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Кол-во одновременных клиентов',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Кол-во запросов на каждый адрес',
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен для запросов от имени пользователя',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Адрес запроса, можно указать несколько раз',
+        )
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        for path in options['paths'] or READ_PATHS:
+            if path.startswith('/api/users/me/') and not headers:
+                continue
+            self.run_path(options['url'] + path, headers, options)
+
+    def run_path(self, url, headers, options):
+        """Выполняет запросы к адресу и печатает статистику."""
+        local = threading.local()
+        errors = []
+
+        def request(_):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+            started = time.perf_counter()
+            response = session.get(url, headers=headers)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            return elapsed
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            latencies = sorted(
+                executor.map(request, range(options['requests']))
+            )
+        total = time.perf_counter() - started
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{url}: {len(latencies) / total:.0f} rps, '
+            f'p50 {quantiles[49] * 1000:.1f} ms, '
+            f'p95 {quantiles[94] * 1000:.1f} ms, '
+            f'p99 {quantiles[98] * 1000:.1f} ms, '
+            f'errors {len(errors)}'
+        )
@@ -0,0 +1,417 @@
+import json
+import os
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import Resolver404, resolve
+from rest_framework.authtoken.models import Token
+
+from api.instrumentation import current_stats
+from api.reference import ingredients_reference, tags_reference
+from api.urls import router_v1
+from recipes.generator import generate
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+from .benchmark_endpoints import quiet_logger
+
+# Файл с бюджетами: размер страницы, {маршрут: {метод: запросов}}
+# и маршруты без сценария с причиной {маршрут: {метод: причина}}.
+BUDGETS_PATH = os.path.join(settings.BASE_DIR, 'api', 'query_budgets.json')
+
+# Коллекция Postman, запросы которой используются как сценарии:
+COLLECTION_PATH = os.path.join(
+    settings.BASE_DIR.parent,
+    'postman_collection',
+    'foodgram.postman_collection.json',
+)
+
+# Пароль пользователя сценариев (меняется в откатываемой транзакции):
+USER_PASSWORD = 'query-budgets-password'
+
+# Картинка 1x1 для сценариев, где она обязательна:
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACV'
+    'BMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAgg'
+    'CByxOyYQAAAABJRU5ErkJggg=='
+)
+
+# Сценарии для маршрутов, которых нет в коллекции Postman:
+# метод, адрес, заголовок авторизации и тело запроса.
+EXTRA_REQUESTS = (
+    ('GET', '{{baseUrl}}/api/recipes/feed/', 'Token {{userToken}}', None),
+    (
+        'GET',
+        '{{baseUrl}}/api/recipes/cookable/'
+        '?available={{firstIndredientId}},{{secondIndredientId}}',
+        'Token {{userToken}}',
+        None,
+    ),
+    (
+        'GET',
+        '{{baseUrl}}/api/recipes/?ingredients={{firstIndredientId}}'
+        '&search={{ingredientNameFirstLatter}}',
+        None,
+        None,
+    ),
+    (
+        'POST',
+        '{{baseUrl}}/api/recipes/favorite/',
+        'Token {{userToken}}',
+        '{"recipes": [{{thirdRecipeId}}, {{fourthRecipeId}}]}',
+    ),
+    (
+        'DELETE',
+        '{{baseUrl}}/api/recipes/favorite/',
+        'Token {{userToken}}',
+        '{"recipes": [{{thirdRecipeId}}, {{fourthRecipeId}}]}',
+    ),
+    (
+        'POST',
+        '{{baseUrl}}/api/recipes/shopping_cart/',
+        'Token {{userToken}}',
+        '{"recipes": [{{thirdRecipeId}}, {{fourthRecipeId}}]}',
+    ),
+    (
+        'DELETE',
+        '{{baseUrl}}/api/recipes/shopping_cart/',
+        'Token {{userToken}}',
+        '{"recipes": [{{thirdRecipeId}}, {{fourthRecipeId}}]}',
+    ),
+    (
+        'PATCH',
+        '{{baseUrl}}/api/users/{{userId}}/',
+        'Token {{userToken}}',
+        '{"first_name": "Имя"}',
+    ),
+    (
+        'PUT',
+        '{{baseUrl}}/api/users/{{userId}}/',
+        'Token {{userToken}}',
+        '{"email": "budgets@example.com", "username": "budgets", '
+        '"first_name": "Имя", "last_name": "Фамилия", '
+        f'"avatar": "{IMAGE}"}}',
+    ),
+    (
+        'POST',
+        '{{baseUrl}}/api/users/set_email/',
+        'Token {{userToken}}',
+        '{"current_password": "{{userPassword}}", '
+        '"new_email": "budgets@example.com"}',
+    ),
+    (
+        'DELETE',
+        '{{baseUrl}}/api/users/{{userId}}/',
+        'Token {{userToken}}',
+        '{"current_password": "{{userPassword}}"}',
+    ),
+)
+
+# Служебные запросы вложенных транзакций не входят в бюджет:
+IGNORED_SQL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+# Переменные Postman в адресах и телах запросов:
+VARIABLE = re.compile(r'{{(\w+)}}')
+
+
+def get_routes():
+    """Пары (маршрут, метод) всех адресов router_v1.
+
+    Методы, которые вьюсет не разрешает (`http_method_names`),
+    не учитываются, HEAD выполняется так же, как GET.
+    """
+    routes = set()
+    for pattern in router_v1.urls:
+        actions = getattr(pattern.callback, 'actions', None) or {}
+        allowed = pattern.callback.cls.http_method_names
+        routes.update(
+            (pattern.name, method.upper()) for method in actions
+            if method in allowed and method != 'head'
+        )
+    return routes
+
+
+def iter_collection(items, auth=None):
+    """Запросы коллекции Postman с унаследованной авторизацией."""
+    for item in items:
+        item_auth = item.get('auth', auth)
+        if 'item' in item:
+            yield from iter_collection(item['item'], item_auth)
+            continue
+        request = item['request']
+        request_auth = request.get('auth', item_auth)
+        header = None
+        if request_auth and request_auth['type'] == 'apikey':
+            header = next(
+                entry['value'] for entry in request_auth['apikey']
+                if entry['key'] == 'value'
+            )
+        url = request['url']
+        yield (
+            request['method'],
+            url['raw'] if isinstance(url, dict) else url,
+            header,
+            request.get('body', {}).get('raw'),
+        )
+
+
+def get_variables(collection):
+    """Значения переменных Postman по данным в БД."""
+    variables = {
+        variable['key']: variable['value']
+        for variable in collection.get('variable', ())
+    }
+    authors = list(
+        User.objects.order_by('-recipes_count', 'pk')[:3]
+    )
+    user = User.objects.exclude(
+        pk__in=[author.pk for author in authors]
+    ).order_by('pk').first() or authors[-1]
+    user.set_password(USER_PASSWORD)
+    user.save(update_fields=('password',))
+    author = authors[0]
+    third_user = authors[1] if len(authors) > 1 else user
+    recipes = list(
+        Recipe.objects.filter(author=author).order_by('pk').values_list(
+            'pk', flat=True
+        )[:5]
+    )
+    recipes += list(
+        Recipe.objects.exclude(pk__in=recipes).order_by('pk').values_list(
+            'pk', flat=True
+        )[:5 - len(recipes)]
+    )
+    tags = list(Tag.objects.order_by('pk'))
+    tags += tags[-1:] * (3 - len(tags))
+    ingredients = list(Ingredient.objects.order_by('pk')[:2])
+    variables.update({
+        'baseUrl': '',
+        'userId': user.pk,
+        'userToken': Token.objects.get_or_create(user=user)[0].key,
+        'userPassword': USER_PASSWORD,
+        'secondUserId': author.pk,
+        'secondUserToken': Token.objects.get_or_create(user=author)[0].key,
+        'thirdUserId': third_user.pk,
+        'firstTagId': tags[0].pk,
+        'secondTagId': tags[1].pk,
+        'thirdTagId': tags[2].pk,
+        'secondTagSlug': tags[1].slug,
+        'thirdTagSlug': tags[2].slug,
+        'firstIndredientId': ingredients[0].pk,
+        'secondIndredientId': ingredients[-1].pk,
+        'ingredientNameFirstLatter': ingredients[0].name[:1],
+    })
+    for number, recipe_id in zip(
+        ('first', 'second', 'third', 'fourth', 'fifth'), recipes
+    ):
+        variables[f'{number}RecipeId'] = recipe_id
+    return variables
+
+
+def substitute(text, variables):
+    """Подставляет значения переменных Postman."""
+    if text is None:
+        return None
+    return VARIABLE.sub(lambda match: str(variables[match[1]]), text)
+
+
+def with_page_size(path, page_size):
+    """Добавляет размер страницы, если он не задан в адресе."""
+    url = urlsplit(path)
+    query = parse_qsl(url.query, keep_blank_values=True)
+    if 'limit' not in dict(query):
+        query.append(('limit', page_size))
+    return url._replace(query=urlencode(query)).geturl()
+
+
+def reset_caches():
+    """Сбрасывает кэш ответов, оставляя справочники загруженными.
+
+    Так каждый запрос замеряется с холодным кэшем ответов, а повторные
+    загрузки справочников не попадают в подсчет.
+    """
+    cache.clear()
+    for reference in (tags_reference, ingredients_reference):
+        reference.bump()
+        reference.load()
+
+
+class Command(BaseCommand):
+    """Проверяет кол-во SQL-запросов маршрутов API по бюджетам.
+
+    Сценарии берутся из коллекции Postman и EXTRA_REQUESTS, переменные
+    коллекции заполняются по данным в БД. Каждый запрос выполняется
+    в транзакции, которая откатывается, с холодным кэшем ответов.
+    Для маршрута и метода берется максимум по всем сценариям. Маршрут
+    без сценария или без бюджета - ошибка, если он не указан в `exempt`.
+    """
+
+    help = 'Проверяет, что маршруты API не превышают бюджет SQL-запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budgets',
+            default=BUDGETS_PATH,
+            help='Файл json с бюджетами',
+        )
+        parser.add_argument(
+            '--collection',
+            default=COLLECTION_PATH,
+            help='Коллекция Postman со сценариями',
+        )
+        parser.add_argument(
+            '--generate',
+            action='store_true',
+            help='Сгенерировать данные на время проверки (с откатом)',
+        )
+        parser.add_argument(
+            '--write',
+            action='store_true',
+            help='Записать в файл бюджетов текущее кол-во запросов',
+        )
+
+    def handle(self, *args, **options):
+        with open(options['budgets'], encoding='utf-8') as file:
+            budgets = json.load(file)
+        collection = {}
+        if os.path.exists(options['collection']):
+            with open(options['collection'], encoding='utf-8') as file:
+                collection = json.load(file)
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Коллекция {options["collection"]} не найдена, '
+                'используются только EXTRA_REQUESTS'
+            ))
+
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            SQL_SAMPLE_RATE=1,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'query-budgets',
+            }},
+        ), quiet_logger('api.middleware'), quiet_logger('django.request'), (
+            transaction.atomic()
+        ):
+            if options['generate']:
+                generate(
+                    users=50, recipes=300, favorites=5, carts=3,
+                    subscriptions=5,
+                )
+            if not Recipe.objects.exists():
+                raise CommandError(
+                    'Нет рецептов: выполните generate_data или '
+                    'запустите команду с --generate'
+                )
+            measured = self.run_requests(
+                collection, budgets['page_size']
+            )
+            transaction.set_rollback(True)
+        exempt = {
+            (name, method)
+            for name, methods in budgets.get('exempt', {}).items()
+            for method in methods
+        }
+        missing = get_routes() - set(measured) - exempt
+
+        if options['write']:
+            budgets['routes'] = {}
+            for (name, method), (count, *_) in sorted(measured.items()):
+                budgets['routes'].setdefault(name, {})[method] = count
+            with open(options['budgets'], 'w', encoding='utf-8') as file:
+                json.dump(budgets, file, ensure_ascii=False, indent=2)
+                file.write('\n')
+            self.stdout.write(self.style.SUCCESS(
+                f'BUDGETS WRITTEN TO {options["budgets"]}'
+            ))
+            return
+        self.check_budgets(budgets['routes'], measured, missing)
+
+    def run_requests(self, collection, page_size):
+        """Выполняет сценарии, возвращает максимум запросов маршрутов.
+
+        Результат - {(маршрут, метод): (кол-во, адрес, статистика)}
+        для самого дорогого сценария маршрута.
+        """
+        variables = get_variables(collection)
+        routes = get_routes()
+        requests = (
+            *iter_collection(collection.get('item', ())),
+            *EXTRA_REQUESTS,
+        )
+        client = Client(raise_request_exception=False)
+        measured = {}
+        for method, url, auth, body in requests:
+            path = substitute(url, variables)
+            try:
+                name = resolve(urlsplit(path).path).url_name
+            except Resolver404:
+                continue
+            if (name, method) not in routes:
+                continue
+            if method == 'GET':
+                path = with_page_size(path, page_size)
+            headers = {}
+            if auth:
+                headers['HTTP_AUTHORIZATION'] = substitute(auth, variables)
+            reset_caches()
+            with transaction.atomic():
+                response = client.generic(
+                    method, path, substitute(body, variables) or '',
+                    content_type='application/json', **headers
+                )
+                stats = response.wsgi_request.query_stats
+                if response.streaming:
+                    # Потоковый ответ выполняет запросы при чтении тела.
+                    token = current_stats.set(stats)
+                    try:
+                        b''.join(response.streaming_content)
+                    finally:
+                        current_stats.reset(token)
+                transaction.set_rollback(True)
+            if response.status_code >= 500:
+                raise CommandError(
+                    f'{method} {path}: ответ {response.status_code}'
+                )
+            count = sum(
+                number for sql, number in stats.fingerprints.items()
+                if not sql.startswith(IGNORED_SQL)
+            )
+            if count >= measured.get((name, method), (-1,))[0]:
+                measured[name, method] = (count, path, stats)
+        return measured
+
+    def check_budgets(self, budgets, measured, missing):
+        """Сравнивает кол-во запросов с бюджетами и сообщает о превышении."""
+        failed = len(missing)
+        for name, method in sorted(missing):
+            self.stdout.write(self.style.ERROR(
+                f'{name} {method}: нет сценария и маршрут не указан в exempt'
+            ))
+        for (name, method), (count, path, stats) in sorted(
+            measured.items()
+        ):
+            budget = budgets.get(name, {}).get(method)
+            if budget is not None and count <= budget:
+                self.stdout.write(f'{name} {method}: {count}/{budget}')
+                continue
+            failed += 1
+            self.stdout.write(self.style.ERROR(
+                f'{name} {method}: {count} queries, budget {budget} '
+                f'({method} {path})'
+            ))
+            for sql, number in stats.fingerprints.most_common():
+                callers = ', '.join(
+                    caller for caller in stats.callers.get(sql, ())
+                    if caller
+                )
+                self.stdout.write(
+                    f'  x{number} {sql}' + (f' [{callers}]' if callers else '')
+                )
+        if failed:
+            raise CommandError(f'QUERY BUDGETS EXCEEDED: {failed} ROUTES')
+        self.stdout.write(self.style.SUCCESS('ALL QUERY BUDGETS MET'))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.generator import GENERATED_PASSWORD, generate
+
+
+class Command(BaseCommand):
+    """Генерирует синтетические данные в масштабе продакшена."""
+
+    help = (
+        'Создает пользователей, рецепты, избранное, списки покупок '
+        'и подписки с неравномерной (Ципф) популярностью'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Кол-во пользователей',
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=10000,
+            help='Кол-во рецептов',
+        )
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее кол-во рецептов в избранном у пользователя',
+        )
+        parser.add_argument(
+            '--carts', type=float, default=3,
+            help='Среднее кол-во рецептов в списке покупок у пользователя',
+        )
+        parser.add_argument(
+            '--subscriptions', type=float, default=10,
+            help='Среднее кол-во подписок у пользователя',
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения популярности',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты публикации',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора случайных чисел',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Кол-во объектов в одной пачке',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            counts = generate(
+                users=options['users'],
+                recipes=options['recipes'],
+                favorites=options['favorites'],
+                carts=options['carts'],
+                subscriptions=options['subscriptions'],
+                exponent=options['zipf'],
+                seed=options['seed'],
+                days=options['days'],
+                batch_size=options['batch_size'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            'SUCCESSFULLY GENERATED DATA, '
+            f'USER PASSWORD: {GENERATED_PASSWORD}'
+        ))
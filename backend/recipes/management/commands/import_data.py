@@ -1,43 +1,211 @@
-import os
+import csv
+import io
 import json
+import os
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
 from recipes.models import Tag, Ingredient
+from recipes.signals import data_imported
+
+# Путь до директории с файлами по умолчанию
+DATA_PATH = os.path.join(settings.BASE_DIR, 'data')
 
-# Путь до директории с json-файлами
-JSON_PATH = os.path.join('/app/data')
+# Размер пачки записей по умолчанию
+BATCH_SIZE = 1000
 
-# Словарь соответствий модели и json-файла
+# Размер куска файла при потоковом чтении json
+CHUNK_SIZE = 64 * 1024
+
+# Модели для импорта: опция, файл по умолчанию, ключ upsert и поля
 MODEL_FILE_MATCHING = {
-    Tag: 'tags.json',
-    Ingredient: 'ingredients.json'
+    Tag: ('tags', 'tags', 'slug', ('name', 'slug')),
+    Ingredient: (
+        'ingredients', 'ingredients', 'name', ('name', 'measurement_unit')
+    ),
 }
 
 
+def iter_json(file):
+    """Потоково читает json-массив объектов."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise ValueError('Ожидается json-массив объектов')
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
+
+
+def iter_csv(file, fields):
+    """Потоково читает csv с заголовком или без него."""
+    reader = csv.reader(file)
+    for row in reader:
+        if tuple(row) == fields:
+            continue
+        yield dict(zip(fields, row))
+
+
+def batches(items, batch_size):
+    """Разбивает поток записей на пачки."""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def upsert_orm(model, key, fields, batch):
+    """Upsert пачки через ORM, возвращает (создано, обновлено)."""
+    rows = {row[key]: row for row in batch}
+    existing = model.objects.in_bulk(rows, field_name=key)
+    to_create, to_update = [], []
+    for value, row in rows.items():
+        obj = existing.get(value)
+        if obj is None:
+            to_create.append(model(**row))
+        elif any(getattr(obj, field) != row[field] for field in fields):
+            for field in fields:
+                setattr(obj, field, row[field])
+            to_update.append(obj)
+    model.objects.bulk_create(to_create)
+    update_fields = [field for field in fields if field != key]
+    model.objects.bulk_update(to_update, update_fields)
+    return len(to_create), len(to_update)
+
+
+def upsert_copy(model, key, fields, batch):
+    """Upsert пачки через COPY во временную таблицу (PostgreSQL)."""
+    table = model._meta.db_table
+    temp_table = f'import_{table}'
+    columns = ', '.join(fields)
+    current = ', '.join(f'{table}.{field}' for field in fields)
+    excluded = ', '.join(f'EXCLUDED.{field}' for field in fields)
+    updates = ', '.join(
+        f'{field} = EXCLUDED.{field}' for field in fields if field != key
+    )
+    content = io.StringIO()
+    writer = csv.writer(content)
+    for row in batch:
+        writer.writerow(row[field] for field in fields)
+    content.seek(0)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS {temp_table} '
+            f'(LIKE {table} INCLUDING DEFAULTS)'
+        )
+        cursor.execute(f'TRUNCATE {temp_table}')
+        cursor.copy_expert(
+            f'COPY {temp_table} ({columns}) FROM STDIN WITH CSV', content
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT DISTINCT ON ({key}) {columns} FROM {temp_table} '
+            f'ON CONFLICT ({key}) DO UPDATE SET {updates} '
+            f'WHERE ({current}) IS DISTINCT FROM ({excluded}) '
+            'RETURNING (xmax = 0)'
+        )
+        inserted = [row[0] for row in cursor.fetchall()]
+    return inserted.count(True), inserted.count(False)
+
+
 class Command(BaseCommand):
-    """Пользовательская команда Django для импорта данных из json в БД."""
+    """Пользовательская команда Django для импорта данных в БД."""
 
-    help = 'Загружает данные из файлов json в БД'
+    help = 'Загружает данные из файлов json или csv в БД'
 
-    def handle(self, *args, **kwargs):
-        for model, file_name in MODEL_FILE_MATCHING.items():
-            file_path = os.path.join(JSON_PATH, file_name)
-            error_occurred = False
-            try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    objects_to_create = [model(**item) for item in data]
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=DATA_PATH,
+            help='Директория с файлами tags и ingredients',
+        )
+        for option, *_ in MODEL_FILE_MATCHING.values():
+            parser.add_argument(
+                f'--{option}',
+                help=f'Путь до файла {option} (вместо поиска в --path)',
+            )
+        parser.add_argument(
+            '--format',
+            choices=('json', 'csv'),
+            help='Формат файлов, по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Кол-во записей в одной пачке',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY даже на PostgreSQL',
+        )
 
-                    model.objects.bulk_create(
-                        objects_to_create, ignore_conflicts=True
-                    )
+    def get_file(self, options, option, file_name):
+        """Возвращает путь и формат файла для модели."""
+        path = options[option]
+        if path is None:
+            extensions = (
+                (options['format'],) if options['format'] else ('json', 'csv')
+            )
+            paths = [
+                os.path.join(options['path'], f'{file_name}.{extension}')
+                for extension in extensions
+            ]
+            path = next(filter(os.path.exists, paths), paths[0])
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.')
+        )
+        if file_format not in ('json', 'csv'):
+            raise CommandError(f'Неизвестный формат файла {path}')
+        return path, file_format
+
+    def handle(self, *args, **options):
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        upsert = upsert_copy if use_copy else upsert_orm
 
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            'SUCCESSFULLY LOADED '
-                            f'`{model.__name__.upper()}` DATA'
-                        )
+        for model, (option, file_name, key, fields) in (
+            MODEL_FILE_MATCHING.items()
+        ):
+            file_path, file_format = self.get_file(options, option, file_name)
+            try:
+                with open(
+                    file_path, 'r', encoding='utf-8', newline=''
+                ) as file:
+                    rows = (
+                        iter_json(file) if file_format == 'json'
+                        else iter_csv(file, fields)
+                    )
+                    self.import_rows(
+                        model, upsert, key, fields,
+                        batches(rows, options['batch_size']), options
                     )
             except Exception as error:
                 self.stdout.write(
@@ -45,11 +213,39 @@ class Command(BaseCommand):
                         f'Error processing file {file_path}: {error}'
                     )
                 )
-                error_occurred = True
-
-            if error_occurred:
                 self.stdout.write(
                     self.style.ERROR(
                         f'FAILED TO LOAD `{model.__name__.upper()}` DATA'
                     )
                 )
+            finally:
+                data_imported.send(sender=model)
+
+    def import_rows(self, model, upsert, key, fields, rows, options):
+        """Загружает пачки записей и сообщает о скорости."""
+        started = time.monotonic()
+        total = created = updated = 0
+        for batch in rows:
+            batch = [
+                {field: str(row[field]).strip() for field in fields}
+                for row in batch
+            ]
+            batch_created, batch_updated = upsert(model, key, fields, batch)
+            total += len(batch)
+            created += batch_created
+            updated += batch_updated
+            if options['verbosity'] > 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{model.__name__}: {total} rows, '
+                    f'{total / elapsed:.0f} rows/s'
+                )
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                'SUCCESSFULLY LOADED '
+                f'`{model.__name__.upper()}` DATA: {total} rows '
+                f'({created} created, {updated} updated) in {elapsed:.2f}s, '
+                f'{total / elapsed if elapsed else total:.0f} rows/s'
+            )
+        )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    """Пересобирает или проверяет таблицу списков покупок."""
+
+    help = (
+        'Сверяет списки покупок с агрегацией по корзинам '
+        'и пересобирает их'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить расхождения, не меняя данные',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = shopping_list.find_mismatches()
+        for (user_id, ingredient_id), (stored, live) in sorted(
+            mismatches.items()
+        ):
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'stored {stored}, expected {live}'
+            )
+
+        if options['verify']:
+            if mismatches:
+                self.stdout.write(self.style.ERROR(
+                    f'FOUND {len(mismatches)} MISMATCHED ROWS'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    'SHOPPING LISTS ARE CONSISTENT'
+                ))
+            return
+
+        count = shopping_list.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'SUCCESSFULLY REBUILT SHOPPING LISTS: {count} ROWS'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile
+
+
+class Command(BaseCommand):
+    """Сверяет счетчики с фактическим кол-вом связанных объектов."""
+
+    help = 'Исправляет расхождения денормализованных счетчиков'
+
+    def handle(self, *args, **kwargs):
+        for counter, fixed in reconcile().items():
+            style = self.style.WARNING if fixed else self.style.SUCCESS
+            self.stdout.write(style(f'{counter}: FIXED {fixed} ROWS'))
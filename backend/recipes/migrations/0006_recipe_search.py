@@ -0,0 +1,140 @@
+from django.db import migrations
+
+# PostgreSQL: вектор поиска обновляется триггером только при изменении
+# названия или описания, а не при каждом обновлении счетчиков рецепта.
+POSTGRESQL_FORWARD = (
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    """
+    CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT'
+           OR NEW.name IS DISTINCT FROM OLD.name
+           OR NEW.text IS DISTINCT FROM OLD.text THEN
+            NEW.search_vector :=
+                setweight(to_tsvector(
+                    'russian', translate(NEW.name, 'ёЁ', 'еЕ')
+                ), 'A')
+                || setweight(to_tsvector(
+                    'russian', translate(NEW.text, 'ёЁ', 'еЕ')
+                ), 'B');
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search_vector
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector()
+    """,
+    """
+    UPDATE recipes_recipe SET search_vector =
+        setweight(to_tsvector('russian', translate(name, 'ёЁ', 'еЕ')), 'A')
+        || setweight(to_tsvector('russian', translate(text, 'ёЁ', 'еЕ')), 'B')
+    """,
+    'CREATE INDEX recipes_recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+)
+POSTGRESQL_BACKWARD = (
+    'DROP TRIGGER recipes_recipe_search_vector ON recipes_recipe',
+    'DROP FUNCTION recipes_recipe_search_vector()',
+    'ALTER TABLE recipes_recipe DROP COLUMN search_vector',
+)
+
+# SQLite: отдельная таблица FTS5 без копии содержимого, заполняется
+# триггерами. Пересоздание recipes_recipe миграциями Django удаляет
+# триггеры, такие миграции должны повторять SQLITE_FORWARD.
+SQLITE_FORWARD = (
+    """
+    CREATE VIRTUAL TABLE recipes_recipe_search
+    USING fts5(name, text, content='', tokenize='unicode61')
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_search (rowid, name, text) VALUES (
+            new.id,
+            replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_search (
+            recipes_recipe_search, rowid, name, text
+        ) VALUES (
+            'delete',
+            old.id,
+            replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е')
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipe_search_update
+    AFTER UPDATE OF name, text ON recipes_recipe
+    WHEN old.name IS NOT new.name OR old.text IS NOT new.text BEGIN
+        INSERT INTO recipes_recipe_search (
+            recipes_recipe_search, rowid, name, text
+        ) VALUES (
+            'delete',
+            old.id,
+            replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е')
+        );
+        INSERT INTO recipes_recipe_search (rowid, name, text) VALUES (
+            new.id,
+            replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'),
+            replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')
+        );
+    END
+    """,
+    """
+    INSERT INTO recipes_recipe_search (rowid, name, text)
+    SELECT
+        id,
+        replace(replace(name, 'ё', 'е'), 'Ё', 'Е'),
+        replace(replace(text, 'ё', 'е'), 'Ё', 'Е')
+    FROM recipes_recipe
+    """,
+)
+SQLITE_BACKWARD = (
+    'DROP TRIGGER recipes_recipe_search_insert',
+    'DROP TRIGGER recipes_recipe_search_delete',
+    'DROP TRIGGER recipes_recipe_search_update',
+    'DROP TABLE recipes_recipe_search',
+)
+
+STATEMENTS = {
+    'postgresql': (POSTGRESQL_FORWARD, POSTGRESQL_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run_statements(schema_editor, backward=False):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements is None:
+        return
+    for statement in statements[backward]:
+        schema_editor.execute(statement)
+
+
+def create_search(apps, schema_editor):
+    run_statements(schema_editor)
+
+
+def drop_search(apps, schema_editor):
+    run_statements(schema_editor, backward=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
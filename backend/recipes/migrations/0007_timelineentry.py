@@ -0,0 +1,83 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:09
+
+import heapq
+from itertools import groupby
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Значения FANOUT_MAX_FOLLOWERS и TIMELINE_MAX_LENGTH на момент миграции.
+FANOUT_MAX_FOLLOWERS = 1000
+TIMELINE_MAX_LENGTH = 500
+
+
+def fill_timelines(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    TimelineEntry = apps.get_model('recipes', 'TimelineEntry')
+    subscriptions = Subscription.objects.filter(
+        author__subscribers_count__lte=FANOUT_MAX_FOLLOWERS
+    ).order_by('user_id').values_list('user_id', 'author_id')
+    recent = {}
+    for user_id, rows in groupby(
+        subscriptions.iterator(), key=lambda row: row[0]
+    ):
+        entries = []
+        for _, author_id in rows:
+            if author_id not in recent:
+                recent[author_id] = list(
+                    Recipe.objects.filter(author_id=author_id).order_by(
+                        '-pub_date', '-pk'
+                    ).values_list('pub_date', 'pk')[:TIMELINE_MAX_LENGTH]
+                )
+            entries.extend(
+                (pub_date, recipe_id, author_id)
+                for pub_date, recipe_id in recent[author_id]
+            )
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for pub_date, recipe_id, author_id
+            in heapq.nlargest(TIMELINE_MAX_LENGTH, entries)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0006_recipe_search'),
+        ('users', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Ленты подписок',
+                'ordering': ('user', '-pub_date', '-recipe'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_user_recipe_timeline'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,7 @@ from django.core.validators import (
     FileExtensionValidator,
 )
 
+from users.counters import CountersMixin
 from users.models import User
 from .constants import (
     MAX_RECIPE_NAME_LEN,
@@ -70,7 +71,7 @@ class Tag(models.Model):
         return self.name[:CHAR_LIMIT]
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     """Модель рецепта."""
 
     author = models.ForeignKey(
@@ -130,6 +131,18 @@ class Recipe(models.Model):
         db_index=True,
         verbose_name='Дата публикации'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное',
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в список покупок',
+    )
+
+    counter_fields = ('favorites_count', 'shopping_carts_count')
 
     class Meta:
         ordering = ('-pub_date',)
@@ -239,3 +252,86 @@ class Favorite(UserRecipeModel):
     class Meta(UserRecipeModel.Meta):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
+
+
+class ShoppingListItem(models.Model):
+    """Модель суммарного кол-ва ингредиента в списке покупок."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее кол-во',
+    )
+
+    class Meta:
+        ordering = ('user', 'ingredient')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_user_ingredient_shopping_list',
+            ),
+        )
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списков покупок'
+
+    def __str__(self):
+        return (
+            f'{self.user.username}: {self.ingredient.name} '
+            f'{self.total_amount}'
+        )
+
+
+class TimelineEntry(models.Model):
+    """Модель записи ленты подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        ordering = ('user', '-pub_date', '-recipe')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_user_recipe_timeline',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='timeline_user_pub_date_idx',
+            ),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'{self.user.username}: {self.recipe.name}'
@@ -0,0 +1,98 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .constants import SEARCH_CONFIG, SEARCH_FTS_TABLE, SEARCH_FTS_WEIGHTS
+
+
+def get_words(query):
+    """Слова поискового запроса в нижнем регистре, ё заменена на е."""
+    return re.findall(r'\w+', query.casefold().replace('ё', 'е'))
+
+
+def search_postgresql(queryset, words):
+    """Поиск по вектору с GIN-индексом, ранжирование ts_rank."""
+    table = queryset.model._meta.db_table
+    params = (SEARCH_CONFIG, ' & '.join(f'{word}:*' for word in words))
+    return queryset.filter(
+        RawSQL(
+            f'{table}.search_vector @@ to_tsquery(%s::regconfig, %s)',
+            params,
+            output_field=BooleanField(),
+        )
+    ).annotate(
+        search_rank=RawSQL(
+            f'ts_rank({table}.search_vector, '
+            'to_tsquery(%s::regconfig, %s))',
+            params,
+            output_field=FloatField(),
+        )
+    )
+
+
+def search_sqlite(queryset, words):
+    """Поиск по таблице FTS5, ранжирование bm25."""
+    table = queryset.model._meta.db_table
+    match = ' '.join(f'"{word}"*' for word in words)
+    weights = ', '.join(str(weight) for weight in SEARCH_FTS_WEIGHTS)
+    return queryset.filter(
+        pk__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_FTS_TABLE} '
+            f'WHERE {SEARCH_FTS_TABLE} MATCH %s',
+            (match,),
+        )
+    ).annotate(
+        search_rank=RawSQL(
+            f'SELECT -bm25({SEARCH_FTS_TABLE}, {weights}) '
+            f'FROM {SEARCH_FTS_TABLE} '
+            f'WHERE {SEARCH_FTS_TABLE} MATCH %s '
+            f'AND rowid = {table}.id',
+            (match,),
+            output_field=FloatField(),
+        )
+    )
+
+
+def search_icontains(queryset, words):
+    """Поиск подстрокой для остальных БД, выше - совпадения в названии."""
+    for word in words:
+        queryset = queryset.filter(
+            Q(name__icontains=word) | Q(text__icontains=word)
+        )
+    return queryset.annotate(
+        search_rank=sum(
+            (
+                Case(
+                    When(name__icontains=word, then=Value(1.0)),
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                )
+                for word in words
+            ),
+            Value(0.0),
+        )
+    )
+
+
+SEARCH_BACKENDS = {
+    'postgresql': search_postgresql,
+    'sqlite': search_sqlite,
+}
+
+
+def search_recipes(queryset, query):
+    """Полнотекстовый поиск рецептов по названию и описанию.
+
+    Каждое слово запроса ищется как префикс, результаты отсортированы
+    по релевантности. Для БД без полнотекстового поиска слова ищутся
+    подстрокой.
+    """
+    words = get_words(query)
+    if not words:
+        return queryset.none()
+    search = SEARCH_BACKENDS.get(
+        connections[queryset.db].vendor, search_icontains
+    )
+    return search(queryset, words).order_by('-search_rank', '-pub_date')
@@ -0,0 +1,180 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Case, F, Subquery, Sum, When
+from django.db.models.functions import Greatest
+
+from .models import (
+    Ingredient,
+    IngredientInRecipe,
+    ShoppingCart,
+    ShoppingListItem,
+)
+
+
+@transaction.atomic
+def apply_deltas(deltas):
+    """Применяет изменения к спискам покупок.
+
+    `deltas` - словарь {(user_id, ingredient_id): изменение кол-ва}.
+    Недостающие строки вставляются с нулем, пропуская конфликты
+    с одновременными вставками, затем все строки меняются одним UPDATE
+    от текущего значения в БД. Строки с нулевым итогом удаляются.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, total_amount=0
+            )
+            for (user_id, ingredient_id), delta in deltas.items()
+            if delta > 0
+        ),
+        ignore_conflicts=True,
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in={user_id for user_id, _ in deltas},
+        ingredient_id__in={ingredient_id for _, ingredient_id in deltas},
+    )
+    items.update(total_amount=Case(
+        *(
+            When(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                then=Greatest(F('total_amount') + delta, 0),
+            )
+            for (user_id, ingredient_id), delta in deltas.items()
+        ),
+        default=F('total_amount'),
+    ))
+    if min(deltas.values()) < 0:
+        items.filter(total_amount=0).delete()
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    """Добавляет ингредиенты рецептов в список покупок пользователя."""
+    amounts = IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values('ingredient_id').annotate(
+        total_amount=Sum('amount')
+    ).order_by()
+    apply_deltas({
+        (user_id, row['ingredient_id']): sign * row['total_amount']
+        for row in amounts
+    })
+
+
+def add_recipe(user_id, recipe_id, sign=1):
+    """Добавляет ингредиенты рецепта в список покупок пользователя."""
+    add_recipes(user_id, (recipe_id,), sign)
+
+
+def remove_recipe(user_id, recipe_id):
+    """Убирает ингредиенты рецепта из списка покупок пользователя."""
+    add_recipe(user_id, recipe_id, sign=-1)
+
+
+def insert_missing(recipe_id, ingredient_ids):
+    """Вставляет нулевые строки ингредиентов в списки покупок.
+
+    Один INSERT ... SELECT по корзинам с рецептом, существующие строки
+    пропускаются.
+    """
+    items = ShoppingListItem._meta.db_table
+    carts = ShoppingCart._meta.db_table
+    ingredients = Ingredient._meta.db_table
+    placeholders = ', '.join(['%s'] * len(ingredient_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{items} (user_id, ingredient_id, total_amount) '
+            f'SELECT {carts}.user_id, {ingredients}.id, 0 '
+            f'FROM {carts}, {ingredients} '
+            f'WHERE {carts}.recipe_id = %s '
+            f'AND {ingredients}.id IN ({placeholders}) '
+            + connection.ops.ignore_conflicts_suffix_sql(
+                ignore_conflicts=True
+            ),
+            (recipe_id, *ingredient_ids),
+        )
+
+
+@transaction.atomic
+def update_recipe(recipe_id, old_amounts, new_amounts):
+    """Переносит изменение ингредиентов рецепта в списки покупок.
+
+    Для каждого измененного ингредиента выполняется один UPDATE строк
+    всех пользователей, у которых рецепт в корзине.
+    """
+    changes = {
+        ingredient_id: (
+            new_amounts.get(ingredient_id, 0)
+            - old_amounts.get(ingredient_id, 0)
+        )
+        for ingredient_id in old_amounts.keys() | new_amounts.keys()
+        if new_amounts.get(ingredient_id) != old_amounts.get(ingredient_id)
+    }
+    if not changes:
+        return
+    added = [pk for pk, delta in changes.items() if delta > 0]
+    if added:
+        insert_missing(recipe_id, added)
+    items = ShoppingListItem.objects.filter(user_id__in=Subquery(
+        ShoppingCart.objects.filter(recipe_id=recipe_id).values('user_id')
+    ))
+    for ingredient_id, delta in changes.items():
+        items.filter(ingredient_id=ingredient_id).update(
+            total_amount=Greatest(F('total_amount') + delta, 0)
+        )
+    removed = [pk for pk, delta in changes.items() if delta < 0]
+    if removed:
+        items.filter(ingredient_id__in=removed, total_amount=0).delete()
+
+
+def get_live_totals():
+    """Считает списки покупок агрегацией по рецептам в корзинах."""
+    totals = defaultdict(int)
+    rows = IngredientInRecipe.objects.filter(
+        recipe__shoppingcarts__isnull=False
+    ).values(
+        'recipe__shoppingcarts__user', 'ingredient'
+    ).annotate(total_amount=Sum('amount')).order_by()
+    for row in rows.iterator():
+        key = (row['recipe__shoppingcarts__user'], row['ingredient'])
+        totals[key] = row['total_amount']
+    return totals
+
+
+def find_mismatches():
+    """Возвращает {(user_id, ingredient_id): (в таблице, фактически)}."""
+    stored = dict(
+        ((user_id, ingredient_id), total_amount)
+        for user_id, ingredient_id, total_amount
+        in ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'total_amount'
+        ).iterator()
+    )
+    live = get_live_totals()
+    return {
+        key: (stored.get(key, 0), live.get(key, 0))
+        for key in stored.keys() | live.keys()
+        if stored.get(key, 0) != live.get(key, 0)
+    }
+
+
+@transaction.atomic
+def rebuild():
+    """Пересобирает таблицу списков покупок, возвращает кол-во строк."""
+    ShoppingListItem.objects.all().delete()
+    items = ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=user_id,
+            ingredient_id=ingredient_id,
+            total_amount=total_amount,
+        )
+        for (user_id, ingredient_id), total_amount
+        in get_live_totals().items()
+    )
+    return len(items)
@@ -0,0 +1,128 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from users.counters import change_counter
+from users.models import Subscription, User
+from . import shopping_list, timeline
+from .constants import AVATAR_IMAGE_VARIANTS, RECIPE_IMAGE_VARIANTS
+from .images import schedule_variants
+from .models import Favorite, Recipe, ShoppingCart
+
+# Счетчики рецепта для моделей избранного и списка покупок:
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_carts_count',
+}
+
+# Отправляется после массового импорта данных модели (без post_save):
+data_imported = Signal()
+
+# Отправляется после массового добавления рецептов в избранное
+# или список покупок (bulk_create не вызывает post_save):
+recipes_bulk_added = Signal()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_added(sender, instance, created, **kwargs):
+    """Добавляет ингредиенты рецепта в список покупок."""
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(recipes_bulk_added, sender=ShoppingCart)
+def shopping_cart_bulk_added(sender, user_id, recipe_ids, **kwargs):
+    """Добавляет ингредиенты нескольких рецептов в список покупок."""
+    if recipe_ids:
+        shopping_list.add_recipes(user_id, recipe_ids)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_removed(sender, instance, **kwargs):
+    """Убирает ингредиенты рецепта из списка покупок.
+
+    Используется pre_delete: при каскадном удалении рецепта его
+    ингредиенты еще доступны.
+    """
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_added(sender, instance, created, **kwargs):
+    """Увеличивает счетчик добавлений рецепта."""
+    if created:
+        change_counter(
+            Recipe.objects.filter(pk=instance.recipe_id),
+            RECIPE_COUNTERS[sender], 1
+        )
+
+
+@receiver(recipes_bulk_added, sender=Favorite)
+@receiver(recipes_bulk_added, sender=ShoppingCart)
+def recipes_bulk_added_counters(sender, recipe_ids, **kwargs):
+    """Увеличивает счетчики добавлений нескольких рецептов."""
+    if recipe_ids:
+        change_counter(
+            Recipe.objects.filter(pk__in=recipe_ids),
+            RECIPE_COUNTERS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_removed(sender, instance, **kwargs):
+    """Уменьшает счетчик добавлений рецепта."""
+    change_counter(
+        Recipe.objects.filter(pk=instance.recipe_id),
+        RECIPE_COUNTERS[sender], -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    """Увеличивает счетчик рецептов автора."""
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Уменьшает счетчик рецептов автора."""
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    """Рассылает новый рецепт по лентам подписчиков автора."""
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def author_followed(sender, instance, created, **kwargs):
+    """Добавляет рецепты автора в ленту нового подписчика."""
+    if created:
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def author_unfollowed(sender, instance, **kwargs):
+    """Убирает рецепты автора из ленты при отписке."""
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    """Ставит в очередь создание вариантов изображения рецепта."""
+    schedule_variants(instance, instance.image, RECIPE_IMAGE_VARIANTS)
+
+
+@receiver(post_save, sender=User)
+def avatar_saved(sender, instance, update_fields=None, **kwargs):
+    """Ставит в очередь создание вариантов аватара."""
+    if update_fields is None or 'avatar' in update_fields:
+        schedule_variants(instance, instance.avatar, AVATAR_IMAGE_VARIANTS)
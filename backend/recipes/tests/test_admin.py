@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from api.tests.utils import create_recipe, create_user
+from users.models import User
+
+
+class CountersAdminTest(TestCase):
+    """Счетчики в админке только для чтения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        cls.author = create_user(1)
+        cls.recipe = create_recipe(cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_change_forms_show_counters_read_only(self):
+        for url, fields in (
+            (f'/admin/recipes/recipe/{self.recipe.pk}/change/',
+             ('favorites_count', 'shopping_carts_count')),
+            (f'/admin/users/user/{self.author.pk}/change/',
+             ('recipes_count', 'subscribers_count')),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                form = response.context['adminform'].form
+                for field in fields:
+                    self.assertNotIn(field, form.fields)
+                    self.assertContains(response, f'field-{field}')
@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.utils import create_recipe, create_user, get_client
+from recipes.counters import reconcile
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+class RecipeCountersTest(TestCase):
+    """Счетчики добавлений рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.user = create_user(1), create_user(2)
+        cls.recipe = create_recipe(cls.author)
+
+    def test_signals_change_counters(self):
+        favorite = Favorite.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.recipe.shopping_carts_count, 1)
+        favorite.delete()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+    def test_save_keeps_concurrent_increments(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        stale.name = 'Новое название'
+        stale.save()
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_update_through_api_does_not_write_counters(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = get_client(self.author).patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {'cooking_time': 15},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        updates = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "recipes_recipe"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('favorites_count', updates[0])
+        self.assertNotIn('shopping_carts_count', updates[0])
+
+    def test_counters_in_response(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        client = get_client(self.author)
+        response = client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.data['favorites_count'], 1)
+        self.assertEqual(response.data['shopping_carts_count'], 0)
+        client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {'favorites_count': 100},
+            format='json',
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+    def test_reconcile(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        Recipe.objects.update(favorites_count=5)
+        reconcile()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from api.tests.utils import TempMediaMixin
+from recipes.management.commands.check_query_budgets import BUDGETS_PATH
+
+
+class QueryBudgetsTest(TempMediaMixin, TestCase):
+    """Маршруты API укладываются в бюджеты SQL-запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('import_data', stdout=StringIO())
+
+    def check_budgets(self, budgets=BUDGETS_PATH):
+        stdout = StringIO()
+        try:
+            call_command(
+                'check_query_budgets', generate=True, budgets=budgets,
+                stdout=stdout,
+            )
+        except CommandError as error:
+            raise AssertionError(f'{error}\n{stdout.getvalue()}')
+        return stdout.getvalue()
+
+    def test_routes_within_budgets(self):
+        self.check_budgets()
+
+    def test_route_without_scenario_fails(self):
+        with open(BUDGETS_PATH, encoding='utf-8') as file:
+            budgets = json.load(file)
+        budgets['exempt'].pop('users-activation')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'budgets.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(budgets, file)
+            with self.assertRaisesMessage(AssertionError, 'users-activation'):
+                self.check_budgets(path)
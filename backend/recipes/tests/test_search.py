@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+
+from api.tests.utils import create_recipe, create_user
+from recipes import search
+from recipes.models import Recipe
+
+
+class SearchRecipesTest(TestCase):
+    """Поиск рецептов по названию и описанию."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user(1)
+        cls.pie = create_recipe(author, name='Пирог с яблоками и корицей')
+        cls.salad = create_recipe(author, name='Салат с яблоком')
+        cls.soup = create_recipe(author, name='Суп')
+
+    def get_names(self, query):
+        return [
+            recipe.name
+            for recipe in search.search_recipes(Recipe.objects.all(), query)
+        ]
+
+    def test_search(self):
+        self.assertEqual(
+            self.get_names('пирог'), ['Пирог с яблоками и корицей']
+        )
+        self.assertEqual(self.get_names('!!!'), [])
+
+    def test_other_vendor_falls_back_to_icontains(self):
+        connections = {'default': SimpleNamespace(vendor='oracle')}
+        with mock.patch.object(search, 'connections', connections):
+            self.assertEqual(
+                set(self.get_names('яблок')),
+                {'Пирог с яблоками и корицей', 'Салат с яблоком'},
+            )
+            self.assertEqual(
+                self.get_names('яблок кориц'), ['Пирог с яблоками и корицей']
+            )
+            self.assertEqual(self.get_names('борщ'), [])
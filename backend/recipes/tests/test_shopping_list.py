@@ -0,0 +1,103 @@
+import threading
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+
+from api.tests.utils import create_ingredients, create_recipe, create_user
+from recipes import shopping_list
+from recipes.models import ShoppingCart, ShoppingListItem
+
+
+def get_totals(user):
+    """Список покупок пользователя: {название: кол-во}."""
+    return dict(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient__name', 'total_amount'
+        )
+    )
+
+
+class ShoppingListTest(TestCase):
+    """Инкрементальные итоги списка покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+        cls.flour, cls.sugar, cls.salt = create_ingredients(
+            'мука', 'сахар', 'соль'
+        )
+        cls.first = create_recipe(cls.user, ((cls.flour, 100),))
+        cls.second = create_recipe(
+            cls.user, ((cls.flour, 50), (cls.sugar, 5))
+        )
+
+    def test_add_and_remove_recipes(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.first)
+        ShoppingCart.objects.create(user=self.user, recipe=self.second)
+        self.assertEqual(get_totals(self.user), {'мука': 150, 'сахар': 5})
+
+        ShoppingCart.objects.filter(recipe=self.second).delete()
+        self.assertEqual(get_totals(self.user), {'мука': 100})
+        self.assertEqual(shopping_list.find_mismatches(), {})
+
+    def test_recipe_update(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.second)
+        shopping_list.update_recipe(
+            self.second.pk,
+            {self.flour.pk: 50, self.sugar.pk: 5},
+            {self.flour.pk: 70},
+        )
+        self.assertEqual(get_totals(self.user), {'мука': 70})
+
+    def test_recipe_update_for_all_carts(self):
+        other = create_user(2)
+        ShoppingCart.objects.create(user=self.user, recipe=self.first)
+        ShoppingCart.objects.create(user=self.user, recipe=self.second)
+        ShoppingCart.objects.create(user=other, recipe=self.second)
+        # Точка сохранения, INSERT, UPDATE на ингредиент и DELETE
+        # независимо от кол-ва корзин.
+        with self.assertNumQueries(7) as queries:
+            shopping_list.update_recipe(
+                self.second.pk,
+                {self.flour.pk: 50, self.sugar.pk: 5},
+                {self.flour.pk: 20, self.salt.pk: 3},
+            )
+        for query in queries:
+            self.assertNotIn('CASE', query['sql'])
+        self.assertEqual(get_totals(self.user), {'мука': 120, 'соль': 3})
+        self.assertEqual(get_totals(other), {'мука': 20, 'соль': 3})
+
+    def test_amount_does_not_go_below_zero(self):
+        shopping_list.apply_deltas({(self.user.pk, self.flour.pk): 10})
+        shopping_list.apply_deltas({(self.user.pk, self.flour.pk): -30})
+        self.assertEqual(get_totals(self.user), {})
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentShoppingListTest(TransactionTestCase):
+    """Одновременное первое добавление одного ингредиента."""
+
+    def test_concurrent_first_additions(self):
+        user = create_user(1)
+        flour, = create_ingredients('мука')
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def add():
+            try:
+                with transaction.atomic():
+                    barrier.wait()
+                    shopping_list.apply_deltas({(user.pk, flour.pk): 10})
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(get_totals(user), {'мука': 40})
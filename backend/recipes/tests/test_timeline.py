@@ -0,0 +1,74 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.test import TestCase
+
+from api.tests.utils import create_recipe, create_user
+from recipes import timeline
+from recipes.models import TimelineEntry
+from users.models import Subscription
+
+migration = import_module('recipes.migrations.0007_timelineentry')
+
+
+def get_feed_ids(user):
+    """Id рецептов первой страницы ленты."""
+    return [pk for _, pk in timeline.get_feed(user.pk, 10)]
+
+
+@mock.patch('recipes.timeline.FANOUT_MAX_FOLLOWERS', 1)
+class TimelineTest(TestCase):
+    """Ленты подписок при переходе автора через FANOUT_MAX_FOLLOWERS."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.first, cls.second = (
+            create_user(number) for number in range(1, 4)
+        )
+        cls.recipes = [
+            create_recipe(cls.author, name=f'Рецепт {number}')
+            for number in range(2)
+        ]
+        cls.expected = [recipe.pk for recipe in reversed(cls.recipes)]
+
+    def test_author_stops_fan_out(self):
+        Subscription.objects.create(user=self.first, author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(author=self.author).count(), 2
+        )
+        Subscription.objects.create(user=self.second, author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.author).exists()
+        )
+        self.assertEqual(get_feed_ids(self.first), self.expected)
+        self.assertEqual(get_feed_ids(self.second), self.expected)
+
+    def test_author_resumes_fan_out(self):
+        Subscription.objects.create(user=self.second, author=self.author)
+        Subscription.objects.create(user=self.first, author=self.author)
+        Subscription.objects.filter(user=self.second).delete()
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(
+                author=self.author
+            ).values_list('user', flat=True)),
+            [self.first.pk, self.first.pk],
+        )
+        self.assertEqual(get_feed_ids(self.first), self.expected)
+        self.assertEqual(get_feed_ids(self.second), [])
+
+
+class FillTimelinesMigrationTest(TestCase):
+    """Заполнение лент в миграции 0007."""
+
+    @mock.patch.object(migration, 'TIMELINE_MAX_LENGTH', 3)
+    def test_timeline_capped_across_authors(self):
+        user = create_user(1)
+        for number in range(2, 4):
+            author = create_user(number)
+            for _ in range(2):
+                create_recipe(author)
+            Subscription.objects.create(user=user, author=author)
+        TimelineEntry.objects.all().delete()
+        migration.fill_timelines(apps, None)
+        self.assertEqual(TimelineEntry.objects.filter(user=user).count(), 3)
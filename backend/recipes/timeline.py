@@ -0,0 +1,195 @@
+import heapq
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Q
+
+from users.models import Subscription, User
+from .constants import (
+    FANOUT_MAX_FOLLOWERS,
+    TIMELINE_MAX_LENGTH,
+    TIMELINE_TRIM_EVERY,
+)
+from .models import Recipe, TimelineEntry
+
+
+def is_fanned_out(author_id):
+    """Рассылаются ли рецепты автора по лентам подписчиков."""
+    return User.objects.filter(
+        pk=author_id, subscribers_count__lte=FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+def trim(user_ids):
+    """Удаляет из лент записи сверх TIMELINE_MAX_LENGTH."""
+    for user_id in user_ids:
+        TimelineEntry.objects.filter(
+            pk__in=TimelineEntry.objects.filter(
+                user_id=user_id
+            ).order_by('-pub_date', '-recipe_id').values('pk')[
+                TIMELINE_MAX_LENGTH:
+            ]
+        ).delete()
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    if not is_fanned_out(recipe.author_id):
+        return
+    user_ids = list(
+        Subscription.objects.filter(
+            author_id=recipe.author_id
+        ).values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                recipe=recipe,
+                author_id=recipe.author_id,
+                pub_date=recipe.pub_date,
+            )
+            for user_id in user_ids
+        ),
+        ignore_conflicts=True,
+    )
+    # Ленты обрезаются не при каждой записи, а у части подписчиков.
+    trim(
+        user_id for user_id in user_ids
+        if (user_id + recipe.pk) % TIMELINE_TRIM_EVERY == 0
+    )
+
+
+def get_subscribers_count(author_id):
+    """Кол-во подписчиков автора или None, если автора нет."""
+    return User.objects.filter(pk=author_id).values_list(
+        'subscribers_count', flat=True
+    ).first()
+
+
+def get_recent(author_id):
+    """Последние рецепты автора для ленты: [(id, pub_date)]."""
+    return list(
+        Recipe.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', 'pub_date')[:TIMELINE_MAX_LENGTH]
+    )
+
+
+def fill(user_id, author_id, recipes):
+    """Добавляет рецепты автора в ленту пользователя."""
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True,
+    )
+    trim((user_id,))
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора при подписке.
+
+    Если с этой подпиской у автора стало больше FANOUT_MAX_FOLLOWERS
+    подписчиков, его рецепты убираются из всех лент: дальше они
+    дочитываются из таблицы рецептов.
+    """
+    count = get_subscribers_count(author_id)
+    if count == FANOUT_MAX_FOLLOWERS + 1:
+        TimelineEntry.objects.filter(author_id=author_id).delete()
+    elif count is not None and count <= FANOUT_MAX_FOLLOWERS:
+        fill(user_id, author_id, get_recent(author_id))
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты рецепты автора при отписке.
+
+    Если после отписки рецепты автора снова рассылаются, его последние
+    рецепты добавляются в ленты остальных подписчиков.
+    """
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if get_subscribers_count(author_id) == FANOUT_MAX_FOLLOWERS:
+        recipes = get_recent(author_id)
+        for follower_id in Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True):
+            fill(follower_id, author_id, recipes)
+
+
+@transaction.atomic
+def rebuild():
+    """Пересобирает ленты всех подписчиков, возвращает кол-во записей."""
+    TimelineEntry.objects.all().delete()
+    subscriptions = Subscription.objects.filter(
+        author__subscribers_count__lte=FANOUT_MAX_FOLLOWERS
+    ).order_by('user_id').values_list('user_id', 'author_id')
+    recent = {}
+    count = 0
+    for user_id, rows in groupby(
+        subscriptions.iterator(), key=lambda row: row[0]
+    ):
+        entries = []
+        for _, author_id in rows:
+            if author_id not in recent:
+                recent[author_id] = list(
+                    Recipe.objects.filter(author_id=author_id).order_by(
+                        '-pub_date', '-pk'
+                    ).values_list('pub_date', 'pk')[:TIMELINE_MAX_LENGTH]
+                )
+            entries.extend(
+                (pub_date, recipe_id, author_id)
+                for pub_date, recipe_id in recent[author_id]
+            )
+        count += len(TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for pub_date, recipe_id, author_id
+            in heapq.nlargest(TIMELINE_MAX_LENGTH, entries)
+        ))
+    return count
+
+
+def get_feed(user_id, limit, position=None):
+    """Возвращает до `limit` пар (pub_date, id рецепта) ленты.
+
+    Записи ленты читаются по индексу (user, pub_date), рецепты авторов
+    с большим числом подписчиков дочитываются из таблицы рецептов.
+    `position` - (pub_date, id) последнего рецепта предыдущей страницы.
+    """
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    pulled = Recipe.objects.filter(
+        author__in=Subscription.objects.filter(
+            user_id=user_id,
+            author__subscribers_count__gt=FANOUT_MAX_FOLLOWERS,
+        ).values('author')
+    )
+    if position is not None:
+        pub_date, recipe_id = position
+        entries = entries.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, recipe_id__lt=recipe_id)
+        )
+        pulled = pulled.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=recipe_id)
+        )
+    rows = set(
+        entries.order_by('-pub_date', '-recipe_id').values_list(
+            'pub_date', 'recipe_id'
+        )[:limit]
+    )
+    rows.update(
+        pulled.order_by('-pub_date', '-pk').values_list(
+            'pub_date', 'pk'
+        )[:limit]
+    )
+    return sorted(rows, reverse=True)[:limit]
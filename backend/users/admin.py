@@ -22,24 +22,23 @@ class UserAdmin(BaseUserAdmin):
         'first_name',
         'last_name',
     )
+    readonly_fields = (
+        'recipes_count',
+        'subscribers_count',
+    )
+    fieldsets = (
+        *BaseUserAdmin.fieldsets,
+        ('Счетчики', {'fields': readonly_fields}),
+    )
     search_fields = (
         'email',
         'username',
     )
     list_filter = (
-        'email',
-        'username',
+        'is_staff',
+        'is_active',
     )
-
-    @admin.display(description='Рецепты')
-    def recipes_count(self, obj):
-        """Считает кол-во рецептов пользователя."""
-        return obj.recipes.count()
-
-    @admin.display(description='Подписчики')
-    def subscribers_count(self, obj):
-        """Считает кол-во подписчиков пользователя."""
-        return obj.subscribed_to.count()
+    show_full_result_count = False
 
 
 @admin.register(Subscription)
@@ -51,10 +50,15 @@ class SubscriptionAdmin(admin.ModelAdmin):
         'author',
     )
     search_fields = (
+        'user__username',
+        'author__username',
+    )
+    list_select_related = (
         'user',
         'author',
     )
-    list_filter = (
+    autocomplete_fields = (
         'user',
         'author',
     )
+    show_full_result_count = False
@@ -0,0 +1,32 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+def change_counter(queryset, field, delta):
+    """Атомарно изменяет счетчик, не опуская его ниже нуля."""
+    queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+class CountersMixin:
+    """Не перезаписывает счетчики `counter_fields` при save().
+
+    Счетчики меняются только через change_counter, поэтому значения
+    в загруженном объекте могут устареть: полное сохранение объекта
+    потеряло бы изменения, сделанные после его загрузки.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (
+            update_fields is None and self.pk is not None
+            and not self._state.adding and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
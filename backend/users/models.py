@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
 from django.forms import ValidationError
 
+from .counters import CountersMixin
 from .constants import (
     MAX_EMAIL_LEN,
     MAX_USERNAME_LEN,
@@ -13,7 +14,7 @@ from .constants import (
 from .validators import validate_username
 
 
-class User(AbstractUser):
+class User(CountersMixin, AbstractUser):
     """Кастомная модель пользователя."""
 
     USERNAME_FIELD = 'email'
@@ -47,6 +48,18 @@ class User(AbstractUser):
         ],
         verbose_name='Изображение аватара',
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецепты',
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчики',
+    )
+
+    counter_fields = ('recipes_count', 'subscribers_count')
 
     class Meta:
         ordering = ('username',)
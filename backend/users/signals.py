@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import change_counter
+from .models import Subscription, User
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    """Увеличивает счетчик подписчиков автора."""
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'subscribers_count', 1
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    """Уменьшает счетчик подписчиков автора."""
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'subscribers_count', -1
+    )
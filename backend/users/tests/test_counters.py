@@ -0,0 +1,79 @@
+import base64
+import io
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from api.tests.utils import (
+    TempMediaMixin,
+    create_recipe,
+    create_user,
+    get_client,
+)
+from users.models import Subscription, User
+
+
+class UserCountersTest(TempMediaMixin, TestCase):
+    """Счетчики рецептов и подписчиков пользователя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.user = create_user(1), create_user(2)
+
+    def test_signals_change_counters(self):
+        recipe = create_recipe(self.author)
+        subscription = Subscription.objects.create(
+            user=self.user, author=self.author
+        )
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+        self.assertEqual(self.author.subscribers_count, 1)
+        recipe.delete()
+        subscription.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+        self.assertEqual(self.author.subscribers_count, 0)
+
+    def test_save_keeps_concurrent_increments(self):
+        stale = User.objects.get(pk=self.author.pk)
+        create_recipe(self.author)
+        Subscription.objects.create(user=self.user, author=self.author)
+        stale.first_name = 'Новое имя'
+        stale.save()
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(author.first_name, 'Новое имя')
+        self.assertEqual(author.recipes_count, 1)
+        self.assertEqual(author.subscribers_count, 1)
+
+    def test_subscribers_count_in_response(self):
+        Subscription.objects.create(user=self.user, author=self.author)
+        client = get_client(self.author)
+        for path in (f'/api/users/{self.author.pk}/', '/api/users/me/'):
+            with self.subTest(path=path):
+                response = client.get(path)
+                self.assertEqual(response.data['subscribers_count'], 1)
+
+    def test_avatar_update_does_not_write_counters(self):
+        image = io.BytesIO()
+        Image.new('RGB', (10, 10), 'red').save(image, 'PNG')
+        avatar = 'data:image/png;base64,' + base64.b64encode(
+            image.getvalue()
+        ).decode()
+        client = get_client(self.author)
+        for method, data in (('put', {'avatar': avatar}), ('delete', None)):
+            with self.subTest(method=method), CaptureQueriesContext(
+                connection
+            ) as queries:
+                response = getattr(client, method)(
+                    '/api/users/me/avatar/', data, format='json'
+                )
+                self.assertLess(response.status_code, 300)
+                updates = [
+                    query['sql'] for query in queries
+                    if query['sql'].startswith('UPDATE "users_user"')
+                ]
+                self.assertEqual(len(updates), 1)
+                self.assertNotIn('recipes_count', updates[0])
+                self.assertNotIn('subscribers_count', updates[0])